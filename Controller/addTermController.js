@@ -112,7 +112,8 @@ function handleTeacherChange(event, teachers) {
 }
 
 /**
- * Loads subjects for a given teacher and populates a select element with the subjects.
+ * Loads the subjects a teacher has upcoming lessons of, once per subject, and
+ * populates a select element with them.
  *
  * @async
  * @function loadSubjects
@@ -157,12 +158,9 @@ function handleSubjectChange(event, subjects, teacher_id) {
         hideElement('select_inspectors')
         return
     }
-    var subject = undefined
-    subjects.forEach((element) => {
-        if (element.subject_id == selectedValue) {
-            subject = element
-        }
-    })
+    const subject = subjects.find(
+        (element) => element.subject_id == selectedValue
+    )
 
     if (subject == undefined) {
         hideElement('select_date')
@@ -102,15 +102,19 @@ async function saveDocs() {
             onClick: () => {
                 editableDiv.classList.add('hidden');
                 resetInputsErrors();
-                saveDocsChanges(editableDiv.name, {
-                    lateness_minutes: inputs[0].element.value,
-                    students_attendance: inputs[1].element.value,
-                    room_adaptation: inputs[2].element.value,
-                    content_compatibility: inputs[3].element.value,
-                    substantive_rating: inputs[4].element.value,
-                    final_rating: inputs[5].element.value,
-                    objection: inputs[6].element.value,
-                });
+                saveDocsChanges(
+                    editableDiv.name,
+                    {
+                        lateness_minutes: inputs[0].element.value,
+                        students_attendance: inputs[1].element.value,
+                        room_adaptation: inputs[2].element.value,
+                        content_compatibility: inputs[3].element.value,
+                        substantive_rating: inputs[4].element.value,
+                        final_rating: inputs[5].element.value,
+                        objection: inputs[6].element.value,
+                    },
+                    editableDiv.dataset.reportVersion
+                );
             },
         },
         { text: 'No', color: 'cancel_popup_btn', onClick: () => {} },
@@ -227,16 +231,20 @@ function resetInputsErrors() {
  * @param {string} data.substantive_rating - The substantive rating.
  * @param {string} data.final_rating - The final rating.
  * @param {string} data.objection - The objection status.
+ * @param {string} reportVersion - The report version the changes are based on, sent as `If-Match`.
  * @returns {Promise<void>} - A promise that resolves when the document is saved.
  * @throws {Error} - Throws an error if the document could not be saved.
  */
-async function saveDocsChanges(docsId, data) {
+async function saveDocsChanges(docsId, data, reportVersion) {
     try {
         const response = await fetch(
             `http://localhost:5000/inspection-docs/${docsId}/edit/`,
             {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: {
+                    'Content-Type': 'application/json',
+                    'If-Match': `"${reportVersion}"`,
+                },
                 body: JSON.stringify({
                     lateness_minutes: parseInt(data.lateness_minutes),
                     students_attendance: parseInt(data.students_attendance),
@@ -249,6 +257,14 @@ async function saveDocsChanges(docsId, data) {
             }
         );
 
+        if (response.status == 409) {
+            createPopup(
+                'Someone else has edited this document. Open it again to see their changes before saving yours.',
+                [{ text: 'Ok', color: 'ok_popup_btn', onClick: () => {} }]
+            );
+            return;
+        }
+
         if (!response.ok) {
             throw new Error('Failed to save document');
         }
@@ -318,6 +334,7 @@ async function editItem(id) {
 
         if (docDetails) {
             setDocDetails(docDetails);
+            editableDiv.dataset.reportVersion = docDetails.report_version;
             editableDiv.classList.remove('hidden');
         }
     } catch (error) {
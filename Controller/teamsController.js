@@ -4,7 +4,9 @@ async function loadTeams() {
     teamContainer.innerHTML = ''
 
     try {
-        const response = await fetch('http://localhost:5000/inspection-teams/')
+        const response = await fetch(
+            'http://localhost:5000/inspection-teams/?expand=members'
+        )
         if (!response.ok) {
             throw new Error('Failed to fetch teams')
         }
@@ -25,54 +27,37 @@ async function loadTeams() {
             const membersList = document.createElement('ul')
             membersList.id = `members-${team.id}`
 
-            try {
-                const teamDetailsResponse = await fetch(
-                    `http://localhost:5000/inspection-teams/${team.id}/`
-                )
-                if (!teamDetailsResponse.ok) {
-                    throw new Error(
-                        `Failed to fetch details for team ${team.name}`
-                    )
-                }
-
-                const teamDetails = await teamDetailsResponse.json()
-                const members = teamDetails.teachers
-
-                const maxTotalLength = Math.max(
-                    ...members.map(
-                        (member) =>
-                            `${member.title} ${member.name} ${member.surname}`
-                                .length
-                    )
+            const members = team.teachers
+
+            const maxTotalLength = Math.max(
+                ...members.map(
+                    (member) =>
+                        `${member.title} ${member.name} ${member.surname}`
+                            .length
                 )
-                if (members.length === 0) {
-                    const noMembersMessage = document.createElement('p')
-                    noMembersMessage.textContent = 'No members in this team.'
-                    membersList.appendChild(noMembersMessage)
-                }
-
-                members.forEach((member) => {
-                    const fullText = `${member.title} ${member.name} ${member.surname}`
-                    const paddedText = fullText.padEnd(maxTotalLength, '\u00A0')
-
-                    const memberItem = document.createElement('li')
-                    memberItem.textContent = paddedText
-
-                    const deleteButton = document.createElement('button')
-                    deleteButton.classList.add('buttonRed')
-                    deleteButton.textContent = 'Delete 🗑️'
-                    deleteButton.onclick = () =>
-                        removeMember(team.id, member.id)
-
-                    memberItem.appendChild(deleteButton)
-                    membersList.appendChild(memberItem)
-                })
-            } catch (error) {
-                const errorMessage = document.createElement('p')
-                errorMessage.textContent = `Error loading members for ${team.name}`
-                membersList.appendChild(errorMessage)
+            )
+            if (members.length === 0) {
+                const noMembersMessage = document.createElement('p')
+                noMembersMessage.textContent = 'No members in this team.'
+                membersList.appendChild(noMembersMessage)
             }
 
+            members.forEach((member) => {
+                const fullText = `${member.title} ${member.name} ${member.surname}`
+                const paddedText = fullText.padEnd(maxTotalLength, '\u00A0')
+
+                const memberItem = document.createElement('li')
+                memberItem.textContent = paddedText
+
+                const deleteButton = document.createElement('button')
+                deleteButton.classList.add('buttonRed')
+                deleteButton.textContent = 'Delete 🗑️'
+                deleteButton.onclick = () => removeMember(team.id, member.id)
+
+                memberItem.appendChild(deleteButton)
+                membersList.appendChild(memberItem)
+            })
+
             teamDiv.appendChild(teamHeader)
             teamDiv.appendChild(addButton)
             teamDiv.appendChild(membersList)
@@ -158,13 +143,14 @@ async function addMember(teamId, memberId) {
         )
 
         if (!response.ok) {
-            throw new Error('Failed to add member')
+            const error = await response.json()
+            throw new Error(error.detail)
         }
 
         message.textContent = 'Member added successfully!'
         loadTeams()
     } catch (error) {
-        message.textContent = 'Error adding member, is the team full?'
+        message.textContent = `Error adding member: ${error.message}`
     }
 }
 
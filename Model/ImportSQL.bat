@@ -20,5 +20,8 @@ psql -U postgres -d inspections < "%~dp0drawSQL.sql"
 :: Import the data (InsertData.sql) from the directory where the script was run
 psql -U postgres -d inspections < "%~dp0InsertData.sql"
 
+:: Apply the schema migrations (indexes, constraints) from the directory where the script was run
+python "%~dp0migrate.py"
+
 :: Pause to view output
 pause
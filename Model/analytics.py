@@ -0,0 +1,344 @@
+"""
+Per-semester rollups of the inspection reports.
+
+Statistics such as the average final rating per department, subject type or
+semester, or the lateness distribution per building, used to require every
+report to be downloaded from ``/inspection-docs/{docs_id}/``. An
+``InspectionRollup`` row keeps, for one semester and group, the number of
+reports and the sums and lateness bucket counts the statistics derive from.
+The semester of a report is the one of its inspection schedule, as in the
+listings of ``/inspection-docs/`` and ``/schedule/``, not the one of its lesson.
+
+The counts are additive. Editing a report adds the difference it makes to
+the counters of its groups (``update_rollups``); writes moving inspections
+between lessons recompute the groups of those lessons, in the semester of the
+inspections' schedule, with a single UNION of GROUP BY queries
+(``refresh_rollups``). Both run in the transaction of the write. Rebuilding
+every rollup is also available as a background job (``rebuild_rollups``).
+``rollups_query`` reads the rows of a dimension and ``rollup_stats`` turns them
+into statistics.
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from derived_tables import refresh, replace_rows
+from models_sqlalchemy import (
+    Inspection,
+    InspectionReport,
+    InspectionRollup,
+    InspectionSchedule,
+    Lesson,
+    Subject,
+    Teacher,
+)
+from sqlalchemy import (
+    Select,
+    case,
+    delete,
+    func,
+    literal,
+    select,
+    tuple_,
+    union_all,
+    update,
+)
+
+DIMENSIONS = {
+    "department": Teacher.department,
+    "subject_type": Subject.type,
+    "building": Lesson.building,
+    "semester": InspectionSchedule.year_semester,
+}
+LATENESS_BUCKETS = {
+    "0": "on_time",
+    "1-5": "late_1_5",
+    "6-15": "late_6_15",
+    "over 15": "late_over_15",
+}
+
+
+def rollup_query(dimension, groups=None):
+    """
+    Build the GROUP BY query computing the rollups of a dimension.
+
+    Args:
+        dimension (str): A key of ``DIMENSIONS``.
+        groups (set[tuple[str, str]] | None): The (semester, group value) pairs
+            to compute, or None for all of them.
+
+    Returns:
+        Select: One row per group, with the columns of ``InspectionRollup``.
+    """
+    column = DIMENSIONS[dimension]
+    semester = InspectionSchedule.year_semester
+    lateness = InspectionReport.lateness_minutes
+    query = (
+        select(
+            semester,
+            literal(dimension).label("dimension"),
+            column.label("group_value"),
+            func.count(InspectionReport.id).label("reports"),
+            func.sum(InspectionReport.final_rating).label("final_rating_sum"),
+            func.count(lateness).label("lateness_reports"),
+            func.coalesce(func.sum(lateness), 0).label("lateness_minutes_sum"),
+            func.count(case((lateness <= 0, 1))).label("on_time"),
+            func.count(case((lateness.between(1, 5), 1))).label("late_1_5"),
+            func.count(case((lateness.between(6, 15), 1))).label("late_6_15"),
+            func.count(case((lateness > 15, 1))).label("late_over_15"),
+        )
+        .select_from(Inspection)
+        .join(InspectionReport, InspectionReport.id == Inspection.fk_inspectionReport)
+        .join(
+            InspectionSchedule,
+            InspectionSchedule.id == Inspection.fk_inspectionSchedule,
+        )
+        .join(Lesson, Lesson.id == Inspection.fk_lesson)
+        .join(Subject, Subject.id == Lesson.fk_subject)
+        .join(Teacher, Teacher.id == Lesson.fk_teacher)
+        .where(column.is_not(None))
+        .group_by(semester, column)
+    )
+    if groups is not None:
+        query = query.where(tuple_(semester, column).in_(groups))
+    return query
+
+
+def rollup_key():
+    return tuple_(
+        InspectionRollup.year_semester,
+        InspectionRollup.dimension,
+        InspectionRollup.group_value,
+    )
+
+
+def ids(values):
+    return values if isinstance(values, Select) else list(values)
+
+
+def count_groups(rows):
+    return Counter(
+        (semester, dimension, value)
+        for semester, *values in rows
+        for dimension, value in zip(DIMENSIONS, values)
+        if value is not None
+    )
+
+
+def lesson_groups(db, lessons, schedules):
+    """
+    Find the rollup groups some lessons belong to in the semesters of some
+    inspection schedules.
+
+    The inspections themselves are not needed, so the groups an inspection
+    left by moving to another lesson, or by being removed, are still found.
+
+    Args:
+        db (Session): The database session.
+        lessons (Iterable[int] | Select): The lessons.
+        schedules (Iterable[int] | Select): The inspection schedules.
+
+    Returns:
+        Counter: The number of (lesson, schedule) pairs per (semester,
+            dimension, group value).
+    """
+    return count_groups(
+        db.execute(
+            select(InspectionSchedule.year_semester, *DIMENSIONS.values())
+            .select_from(Lesson)
+            .join(Subject, Subject.id == Lesson.fk_subject)
+            .join(Teacher, Teacher.id == Lesson.fk_teacher)
+            .join(InspectionSchedule, InspectionSchedule.id.in_(ids(schedules)))
+            .where(Lesson.id.in_(ids(lessons)))
+        )
+    )
+
+
+def inspection_groups(db, inspections):
+    """
+    Find the rollup groups some inspections belong to.
+
+    Args:
+        db (Session): The database session.
+        inspections (Iterable[int] | Select): The inspections.
+
+    Returns:
+        Counter: The number of inspections per (semester, dimension, group value).
+    """
+    return count_groups(
+        db.execute(
+            select(InspectionSchedule.year_semester, *DIMENSIONS.values())
+            .select_from(Inspection)
+            .join(
+                InspectionSchedule,
+                InspectionSchedule.id == Inspection.fk_inspectionSchedule,
+            )
+            .join(Lesson, Lesson.id == Inspection.fk_lesson)
+            .join(Subject, Subject.id == Lesson.fk_subject)
+            .join(Teacher, Teacher.id == Lesson.fk_teacher)
+            .where(Inspection.id.in_(ids(inspections)))
+        )
+    )
+
+
+@refresh
+def refresh_rollups(db, lessons=None, schedules=None):
+    """
+    Recompute the rollups of the groups some lessons belong to, or of all groups.
+
+    Args:
+        db (Session): The database session.
+        lessons (Iterable[int] | Select | None): The lessons whose groups are
+            recomputed, or None for every group.
+        schedules (Iterable[int] | Select | None): The inspection schedules
+            whose semesters the groups of the lessons are recomputed in.
+
+    Returns:
+        int: The number of rollups written.
+    """
+    if lessons is None:
+        queries = [rollup_query(dimension) for dimension in DIMENSIONS]
+        stale = delete(InspectionRollup)
+    else:
+        keys = list(lesson_groups(db, lessons, schedules))
+        if not keys:
+            return 0
+        groups = {dimension: set() for dimension in DIMENSIONS}
+        for semester, dimension, value in keys:
+            groups[dimension].add((semester, value))
+        queries = [
+            rollup_query(dimension, pairs)
+            for dimension, pairs in groups.items()
+            if pairs
+        ]
+        stale = delete(InspectionRollup).where(rollup_key().in_(keys))
+
+    refreshed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    rollups = [
+        {**row._mapping, "refreshed_at": refreshed_at}
+        for row in db.execute(union_all(*queries))
+    ]
+    return replace_rows(db, InspectionRollup, stale, rollups)
+
+
+def rebuild_rollups(db):
+    """
+    Recompute the rollups of every group and commit them, as a background job.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        dict: The number of rollups written.
+    """
+    rollups = refresh_rollups(db)
+    db.commit()
+    return {"rollups": rollups}
+
+
+def report_contribution(final_rating, lateness_minutes):
+    """Return what one report adds to each counter of its groups' rollups."""
+    late = lateness_minutes is not None
+    return {
+        "reports": 1,
+        "final_rating_sum": final_rating,
+        "lateness_reports": int(late),
+        "lateness_minutes_sum": lateness_minutes or 0,
+        "on_time": int(late and lateness_minutes <= 0),
+        "late_1_5": int(late and 1 <= lateness_minutes <= 5),
+        "late_6_15": int(late and 6 <= lateness_minutes <= 15),
+        "late_over_15": int(late and lateness_minutes > 15),
+    }
+
+
+def update_rollups(db, inspections, before, after):
+    """
+    Apply the edit of a report to the rollups of its groups.
+
+    Nothing is recomputed: the difference between the old and new contribution
+    of the report is added to the counters of every group of its inspections,
+    with one UPDATE. The session is not committed.
+
+    Args:
+        db (Session): The database session.
+        inspections (Iterable[int] | Select): The inspections of the report.
+        before (tuple[int, int | None]): The final rating and lateness minutes
+            of the report before the edit.
+        after (tuple[int, int | None]): The same values after the edit.
+
+    Returns:
+        int: The number of rollups updated.
+    """
+    old = report_contribution(*before)
+    new = report_contribution(*after)
+    delta = {column: new[column] - old[column] for column in new}
+    if not any(delta.values()):
+        return 0
+
+    by_count = defaultdict(list)
+    for key, count in inspection_groups(db, inspections).items():
+        by_count[count].append(key)
+    refreshed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    updated = 0
+    # Usually every group has one of the inspections, and one statement suffices.
+    for count, keys in by_count.items():
+        updated += db.execute(
+            update(InspectionRollup)
+            .where(rollup_key().in_(keys))
+            .values(
+                refreshed_at=refreshed_at,
+                **{
+                    column: getattr(InspectionRollup, column) + change * count
+                    for column, change in delta.items()
+                    if change
+                },
+            )
+        ).rowcount
+    return updated
+
+
+def rollups_query(dimension, semester=None):
+    """
+    Build the query of the rollups of every group of a dimension.
+
+    Args:
+        dimension (str): A key of ``DIMENSIONS``.
+        semester (str | None): Only read this semester.
+
+    Returns:
+        Select: The ``InspectionRollup`` rows, by semester and group.
+    """
+    query = select(InspectionRollup).where(InspectionRollup.dimension == dimension)
+    if semester is not None:
+        query = query.where(InspectionRollup.year_semester == semester)
+    return query.order_by(InspectionRollup.year_semester, InspectionRollup.group_value)
+
+
+def rollup_stats(rollups):
+    """
+    Turn the rollups read with ``rollups_query`` into statistics.
+
+    Args:
+        rollups (Iterable[InspectionRollup]): The rollups.
+
+    Returns:
+        list[dict]: One entry per semester and group, in the rollups' order.
+    """
+    return [
+        {
+            "semester": rollup.year_semester,
+            "group": rollup.group_value,
+            "reports": rollup.reports,
+            "average_final_rating": round(rollup.final_rating_sum / rollup.reports, 2),
+            "average_lateness_minutes": (
+                round(rollup.lateness_minutes_sum / rollup.lateness_reports, 2)
+                if rollup.lateness_reports
+                else None
+            ),
+            "lateness": {
+                bucket: getattr(rollup, column)
+                for bucket, column in LATENESS_BUCKETS.items()
+            },
+        }
+        for rollup in rollups
+    ]
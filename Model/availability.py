@@ -0,0 +1,292 @@
+"""
+Teacher and inspection team availability.
+
+Every lesson a teacher teaches or inspects is kept as a row of the
+``TeacherBusySlot`` table holding its time range, so checking whether teachers
+are free during a period is a single range probe on the slot index. The slots
+are rebuilt with ``refresh_busy_slots`` for the teachers affected by a write,
+in the same transaction, or for everyone on demand.
+"""
+
+from datetime import timedelta
+
+from derived_tables import refresh, replace_rows
+from models_sqlalchemy import (
+    Inspection,
+    InspectionTeam,
+    Lesson,
+    Teacher,
+    TeacherBusySlot,
+    TeacherInspectionTeam,
+)
+from sqlalchemy import Select, and_, delete, null, select
+
+LESSON_DURATION = timedelta(minutes=90)
+
+
+def lesson_period(lesson_time):
+    """
+    Return the time range occupied by a lesson.
+
+    Args:
+        lesson_time (datetime): The start of the lesson.
+
+    Returns:
+        tuple[datetime, datetime]: The start and end of the lesson.
+    """
+    return lesson_time, lesson_time + LESSON_DURATION
+
+
+def overlapping_slots(starts_at, ends_at):
+    """
+    Build the condition matching busy slots that overlap a time range.
+
+    No slot is longer than ``LESSON_DURATION``, so the overlap is expressed as
+    a bounded range of ``starts_at`` values that the slot index can scan.
+
+    Args:
+        starts_at (datetime): The start of the range.
+        ends_at (datetime): The end of the range.
+
+    Returns:
+        ColumnElement: The filter condition.
+    """
+    return and_(
+        TeacherBusySlot.starts_at > starts_at - LESSON_DURATION,
+        TeacherBusySlot.starts_at < ends_at,
+        TeacherBusySlot.ends_at > starts_at,
+    )
+
+
+def busy_teachers_query(starts_at, ends_at):
+    """
+    Build a query selecting the ids of teachers who are busy during a time range.
+
+    A teacher is busy when they teach, or inspect as a team member, a lesson
+    overlapping the range.
+
+    Args:
+        starts_at (datetime): The start of the range.
+        ends_at (datetime): The end of the range.
+
+    Returns:
+        Select: A query of teacher ids, usable as an IN subquery.
+    """
+    return select(TeacherBusySlot.fk_teacher).where(
+        overlapping_slots(starts_at, ends_at)
+    )
+
+
+def busy_teams_query(starts_at, ends_at):
+    """
+    Build a query selecting the ids of teams that already inspect during a range.
+
+    Args:
+        starts_at (datetime): The start of the range.
+        ends_at (datetime): The end of the range.
+
+    Returns:
+        Select: A query of inspection team ids.
+    """
+    return select(TeacherBusySlot.fk_inspectionTeam).where(
+        overlapping_slots(starts_at, ends_at),
+        TeacherBusySlot.source == "inspecting",
+    )
+
+
+def team_members(team_ids):
+    """
+    Build a query selecting the members of some inspection teams.
+
+    Args:
+        team_ids (Iterable[int]): The ids of the teams.
+
+    Returns:
+        Select: A query of teacher ids, usable as ``refresh_busy_slots`` teachers.
+    """
+    return select(TeacherInspectionTeam.fk_teacher).where(
+        TeacherInspectionTeam.fk_inspectionTeam.in_(team_ids)
+    )
+
+
+def lock_teams(db, team_ids):
+    """
+    Lock some inspection teams until the end of the transaction.
+
+    Writers booking a team, or adding a member to it, take the lock first, so a
+    writer checking that the members are free sees every booking committed
+    before it got the lock. The rows are locked in id order to avoid deadlocks.
+
+    Args:
+        db (Session): The database session.
+        team_ids (Iterable[int]): The ids of the teams.
+    """
+    db.execute(
+        select(InspectionTeam.id)
+        .where(InspectionTeam.id.in_(list(team_ids)))
+        .order_by(InspectionTeam.id)
+        .with_for_update()
+    )
+
+
+@refresh
+def refresh_busy_slots(db, teachers=None):
+    """
+    Rebuild the busy slots of some or all teachers from lessons and inspections.
+
+    Args:
+        db (Session): The database session.
+        teachers (Iterable[int] | Select | None): The teachers whose slots are
+            rebuilt, or None for every teacher.
+
+    Returns:
+        int: The number of slots written.
+    """
+    teaching = select(Lesson.fk_teacher, Lesson.id, Lesson.time, null())
+    inspecting = (
+        select(
+            TeacherInspectionTeam.fk_teacher,
+            Lesson.id,
+            Lesson.time,
+            Inspection.fk_inspectionTeam,
+        )
+        .join(
+            Inspection,
+            Inspection.fk_inspectionTeam == TeacherInspectionTeam.fk_inspectionTeam,
+        )
+        .join(Lesson, Lesson.id == Inspection.fk_lesson)
+    )
+    stale = delete(TeacherBusySlot)
+    if teachers is not None:
+        if not isinstance(teachers, Select):
+            teachers = list(teachers)
+        teaching = teaching.where(Lesson.fk_teacher.in_(teachers))
+        inspecting = inspecting.where(TeacherInspectionTeam.fk_teacher.in_(teachers))
+        stale = stale.where(TeacherBusySlot.fk_teacher.in_(teachers))
+
+    slots = []
+    for source, query in (("teaching", teaching), ("inspecting", inspecting)):
+        for teacher_id, lesson_id, lesson_time, team_id in db.execute(query):
+            starts_at, ends_at = lesson_period(lesson_time)
+            slots.append(
+                {
+                    "fk_teacher": teacher_id,
+                    "starts_at": starts_at,
+                    "ends_at": ends_at,
+                    "source": source,
+                    "fk_lesson": lesson_id,
+                    "fk_inspectionTeam": team_id,
+                }
+            )
+
+    return replace_rows(db, TeacherBusySlot, stale, slots)
+
+
+def available_teams_query(lesson_time, inspected_teacher_id):
+    """
+    Build the query of the candidate members of the teams that may inspect a lesson.
+
+    All candidate members are fetched in a single statement, with their
+    availability probed in the busy slot index, so the cost does not depend on
+    the number of teams or members. Teams containing the inspected teacher or
+    already inspecting another lesson overlapping this one are left out;
+    ``available_teams`` applies the remaining rules to the rows.
+
+    Args:
+        lesson_time (datetime): The start of the lesson being inspected.
+        inspected_teacher_id (int): The teacher being inspected.
+
+    Returns:
+        Select: One row per team member, in team and member order.
+    """
+    own_teams = select(TeacherInspectionTeam.fk_inspectionTeam).where(
+        TeacherInspectionTeam.fk_teacher == inspected_teacher_id
+    )
+    starts_at, ends_at = lesson_period(lesson_time)
+
+    return (
+        select(
+            InspectionTeam.id.label("team_id"),
+            InspectionTeam.name.label("team_name"),
+            Teacher.id.label("teacher_id"),
+            Teacher.name.label("teacher_name"),
+            Teacher.surname.label("teacher_surname"),
+            Teacher.title.label("teacher_title"),
+            Teacher.department.label("teacher_department"),
+            Teacher.id.in_(busy_teachers_query(starts_at, ends_at)).label("busy"),
+        )
+        .join(
+            TeacherInspectionTeam,
+            TeacherInspectionTeam.fk_inspectionTeam == InspectionTeam.id,
+        )
+        .join(Teacher, Teacher.id == TeacherInspectionTeam.fk_teacher)
+        .where(
+            InspectionTeam.id.notin_(own_teams),
+            InspectionTeam.id.notin_(busy_teams_query(starts_at, ends_at)),
+        )
+        .order_by(InspectionTeam.id, TeacherInspectionTeam.id)
+    )
+
+
+def available_teams(rows, department):
+    """
+    Group the rows of ``available_teams_query`` into the available teams.
+
+    Busy members are dropped, and so are the teams left without members or
+    that would send more than one member from the inspected teacher's
+    department.
+
+    Args:
+        rows (Iterable[Row]): The rows of the query.
+        department (str): The department of the inspected teacher.
+
+    Returns:
+        list[dict]: Available teams in the format returned by
+            ``/inspection-teams/{teacher_id}/{lesson_id}/``.
+    """
+    teams = {}
+    for row in rows:
+        team = teams.setdefault(
+            row.team_id,
+            {"name": row.team_name, "members": [], "department_count": 0},
+        )
+        if row.busy:
+            continue
+        if row.teacher_department == department:
+            team["department_count"] += 1
+        team["members"].append(
+            {
+                "teacher_id": row.teacher_id,
+                "teacher_name": row.teacher_name,
+                "teacher_surname": row.teacher_surname,
+                "teacher_title": row.teacher_title,
+                "teacher_department": row.teacher_department,
+            }
+        )
+
+    return [
+        {
+            "inspection_team_id": team_id,
+            "inspection_team_name": team["name"],
+            "members": team["members"],
+        }
+        for team_id, team in teams.items()
+        if team["members"] and team["department_count"] <= 1
+    ]
+
+
+def find_available_teams(db, lesson, inspected_teacher):
+    """
+    Find inspection teams and members that are free to inspect a lesson.
+
+    Args:
+        db (Session): The database session.
+        lesson (Lesson): The lesson being inspected.
+        inspected_teacher (Teacher): The teacher being inspected.
+
+    Returns:
+        list[dict]: Available teams in the format returned by
+            ``/inspection-teams/{teacher_id}/{lesson_id}/``.
+    """
+    rows = db.execute(available_teams_query(lesson.time, inspected_teacher.id))
+    return available_teams(rows, inspected_teacher.department)
@@ -0,0 +1,167 @@
+"""
+Benchmark of the inspection team availability lookup.
+
+Seeds an in-memory SQLite database with a synthetic university (1,000
+teachers and 200 teams by default) and compares the original per-team,
+per-member implementation of ``/inspection-teams/{teacher_id}/{lesson_id}/``
+with the set-based engine in ``availability.py``.
+
+Usage:
+    python benchmark_availability.py [--teachers 1000] [--teams 200] [--lessons 10]
+"""
+
+import argparse
+import random
+import time
+
+from availability import find_available_teams
+from models_sqlalchemy import (
+    Inspection,
+    InspectionTeam,
+    Lesson,
+    Teacher,
+    TeacherInspectionTeam,
+)
+from sqlalchemy.orm import sessionmaker
+from synthetic_data import count_statements, create_sqlite_engine, seed_university
+
+
+def legacy_available_teams(db, lesson, inspected_teacher):
+    """
+    The original availability lookup, kept as the benchmark baseline.
+
+    It issues one query per candidate team and two queries per team member.
+    The join of member inspections is corrected to use
+    ``Inspection.fk_inspectionTeam`` so both implementations agree.
+    """
+    subquery = (
+        db.query(TeacherInspectionTeam.fk_inspectionTeam)
+        .filter(TeacherInspectionTeam.fk_teacher == inspected_teacher.id)
+        .subquery()
+    )
+    inspection_teams = (
+        db.query(InspectionTeam)
+        .join(
+            TeacherInspectionTeam,
+            TeacherInspectionTeam.fk_inspectionTeam == InspectionTeam.id,
+        )
+        .filter(InspectionTeam.id.notin_(subquery.select()))
+        .order_by(InspectionTeam.id)
+        .all()
+    )
+
+    available_teams = []
+    for team in inspection_teams:
+        department_count = 0
+        available_members = []
+
+        team_inspections = (
+            db.query(Inspection)
+            .join(Lesson, Inspection.fk_lesson == Lesson.id)
+            .filter(Inspection.fk_inspectionTeam == team.id, Lesson.time == lesson.time)
+            .all()
+        )
+        if team_inspections:
+            continue
+
+        for member in sorted(team.teachers, key=lambda member: member.id):
+            member_lessons = (
+                db.query(Lesson).filter(Lesson.fk_teacher == member.fk_teacher).all()
+            )
+            member_inspections = (
+                db.query(Lesson)
+                .join(Inspection, Inspection.fk_lesson == Lesson.id)
+                .join(
+                    TeacherInspectionTeam,
+                    TeacherInspectionTeam.fk_inspectionTeam
+                    == Inspection.fk_inspectionTeam,
+                )
+                .filter(TeacherInspectionTeam.fk_teacher == member.fk_teacher)
+                .all()
+            )
+            if any(
+                lesson.time == scheduled_lesson.time
+                for scheduled_lesson in member_lessons + member_inspections
+            ):
+                continue
+
+            if member.teacher.department == inspected_teacher.department:
+                department_count += 1
+                if department_count > 1:
+                    break
+
+            available_members.append(
+                {
+                    "teacher_id": member.teacher.id,
+                    "teacher_name": member.teacher.name,
+                    "teacher_surname": member.teacher.surname,
+                    "teacher_title": member.teacher.title,
+                    "teacher_department": member.teacher.department,
+                }
+            )
+
+        if available_members and department_count <= 1:
+            available_teams.append(
+                {
+                    "inspection_team_id": team.id,
+                    "inspection_team_name": team.name,
+                    "members": available_members,
+                }
+            )
+    return available_teams
+
+
+def measure(engine, session_factory, implementation, lesson_ids):
+    """
+    Run an implementation for every lesson and collect its cost.
+
+    Returns:
+        tuple[list, int, float]: The results, the total statement count and
+            the total wall time in seconds.
+    """
+    results = []
+    started = time.perf_counter()
+    with count_statements(engine) as statements:
+        for lesson_id in lesson_ids:
+            with session_factory() as db:
+                lesson = db.get(Lesson, lesson_id)
+                teacher = db.get(Teacher, lesson.fk_teacher)
+                results.append(implementation(db, lesson, teacher))
+    return results, len(statements), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--teachers", type=int, default=1000)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--lessons", type=int, default=10, help="lessons to probe")
+    args = parser.parse_args()
+
+    engine = create_sqlite_engine()
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        counts = seed_university(db, teachers=args.teachers, teams=args.teams)
+    print(f"seeded: {counts}")
+
+    lesson_ids = random.Random(1).sample(range(1, counts["lessons"] + 1), args.lessons)
+    legacy, legacy_queries, legacy_time = measure(
+        engine, session_factory, legacy_available_teams, lesson_ids
+    )
+    current, current_queries, current_time = measure(
+        engine, session_factory, find_available_teams, lesson_ids
+    )
+    assert legacy == current, "implementations disagree"
+
+    print(f"{'implementation':<16}{'queries/call':>14}{'ms/call':>12}")
+    for name, queries, elapsed in (
+        ("per-member", legacy_queries, legacy_time),
+        ("set-based", current_queries, current_time),
+    ):
+        print(
+            f"{name:<16}{queries / args.lessons:>14.1f}"
+            f"{elapsed * 1000 / args.lessons:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
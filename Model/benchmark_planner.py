@@ -0,0 +1,104 @@
+"""
+Benchmark of the batch inspection planner.
+
+For every size, seeds an in-memory SQLite database with a synthetic university
+of ten lessons per teacher, asks ``planner.py`` to plan a random half of the
+lessons over the given number of teams, and reports the time spent loading
+the data, solving the assignment and writing the inspections, and the
+statements executed. The largest default size is 5,000 lessons over 300 teams.
+
+Usage:
+    python benchmark_planner.py [--sizes 500x30,1000x60,2500x150,5000x300]
+        [--capacity N]
+"""
+
+import argparse
+import random
+import time
+
+import planner
+from sqlalchemy.orm import sessionmaker
+from synthetic_data import count_statements, create_sqlite_engine, seed_university
+
+
+def plan_once(lessons, teams, capacity):
+    """
+    Seed a university and plan inspections for some of its lessons.
+
+    Returns:
+        dict: The planned and unassigned lesson counts, the statements
+            executed and the milliseconds spent in each phase.
+    """
+    engine = create_sqlite_engine()
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    with session_factory() as db:
+        counts = seed_university(
+            db,
+            teachers=lessons // 5,
+            teams=teams,
+            lessons_per_teacher=10,
+            inspections=0,
+        )
+    lesson_ids = random.Random(1).sample(range(1, counts["lessons"] + 1), lessons)
+
+    timings = {}
+    with session_factory() as db, count_statements(engine) as statements:
+        started = time.perf_counter()
+        candidates, _ = planner.load_lessons(db, 1, "Winter 2024", lesson_ids)
+        solver = planner.PlanSolver(
+            planner.load_teams(db),
+            planner.load_busy(db, candidates),
+            {},
+            capacity,
+        )
+        timings["load"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        assignments, unassigned = solver.solve(candidates)
+        timings["solve"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        planner.apply_plan(
+            db,
+            1,
+            [
+                {"fk_lesson": lesson_id, "fk_inspectionTeam": team_id}
+                for lesson_id, team_id in assignments.items()
+            ],
+        )
+        db.commit()
+        timings["write"] = time.perf_counter() - started
+    engine.dispose()
+
+    return {
+        "planned": len(assignments),
+        "unassigned": len(unassigned),
+        "statements": len(statements),
+        **{phase: seconds * 1000 for phase, seconds in timings.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="500x30,1000x60,2500x150,5000x300")
+    parser.add_argument(
+        "--capacity", type=int, default=None, help="most inspections per team"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'lessons':>8}{'teams':>7}{'planned':>9}{'unassigned':>12}"
+        f"{'queries':>9}{'load ms':>10}{'solve ms':>10}{'write ms':>10}"
+    )
+    for size in args.sizes.split(","):
+        lessons, teams = (int(part) for part in size.split("x"))
+        result = plan_once(lessons, teams, args.capacity)
+        print(
+            f"{lessons:>8}{teams:>7}{result['planned']:>9}{result['unassigned']:>12}"
+            f"{result['statements']:>9}{result['load']:>10.1f}"
+            f"{result['solve']:>10.1f}{result['write']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
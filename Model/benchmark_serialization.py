@@ -0,0 +1,179 @@
+"""
+Benchmark of the JSON serialization of the inspection term listing.
+
+Seeds an in-memory SQLite database with 50,000 inspection terms by default,
+runs the ``/inspection-terms/`` query once, and times only what happens to the
+rows afterwards:
+
+    jsonable_encoder      hand-built dicts through FastAPI's generic encoder,
+                          as for endpoints without a response model
+    orjson                hand-built dicts rendered by ORJSONResponse, which
+                          also runs the generic encoder first
+    hand-built dicts      hand-built dicts validated as ``list[dict]`` and
+                          dumped by pydantic-core, the previous listing path
+    typed model           query rows validated as a typed Pydantic model with
+                          ``from_attributes`` and dumped by pydantic-core
+    row_dicts             rows shaped by the query, zipped into dicts and
+                          dumped as ``list[dict]``, the current listing path
+
+Usage:
+    python benchmark_serialization.py [--terms 50000] [--repeat 5]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from model_database_API import row_dicts, teacher_full_name
+from models_sqlalchemy import Inspection, Lesson, Subject, Teacher
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.orm import sessionmaker
+from synthetic_data import create_sqlite_engine, seed_university
+
+
+class InspectionTerm(BaseModel):
+    id: int
+    date: datetime
+    subject: str
+    subject_type: str
+    teacher: str
+    teacher_id: int
+    lesson_id: int
+    team_id: int | None
+
+
+def legacy_terms(db):
+    """Query the terms with the column labels of the hand-built listing."""
+    return (
+        db.query(
+            Inspection.id.label("inspection_id"),
+            Inspection.fk_inspectionTeam.label("team_id"),
+            Lesson.time.label("inspection_date"),
+            Subject.name.label("subject_name"),
+            Subject.type.label("subject_type"),
+            Teacher.name.label("teacher_name"),
+            Teacher.id.label("teacher_id"),
+            Teacher.surname.label("teacher_surname"),
+            Teacher.title.label("teacher_title"),
+            Lesson.id.label("lesson_id"),
+        )
+        .join(Lesson, Inspection.fk_lesson == Lesson.id)
+        .join(Subject, Lesson.fk_subject == Subject.id)
+        .join(Teacher, Lesson.fk_teacher == Teacher.id)
+        .all()
+    )
+
+
+def current_terms(db):
+    """Query the terms the way ``get_inspection_terms`` does."""
+    return (
+        db.query(
+            Inspection.id.label("id"),
+            Lesson.time.label("date"),
+            Subject.name.label("subject"),
+            Subject.type.label("subject_type"),
+            teacher_full_name(),
+            Teacher.id.label("teacher_id"),
+            Lesson.id.label("lesson_id"),
+            Inspection.fk_inspectionTeam.label("team_id"),
+        )
+        .join(Lesson, Inspection.fk_lesson == Lesson.id)
+        .join(Subject, Lesson.fk_subject == Subject.id)
+        .join(Teacher, Lesson.fk_teacher == Teacher.id)
+        .all()
+    )
+
+
+def build_dicts(rows):
+    """Build the response dicts by hand, as the listing used to."""
+    return [
+        {
+            "id": term.inspection_id,
+            "date": term.inspection_date,
+            "subject": term.subject_name,
+            "subject_type": term.subject_type,
+            "teacher": f"{term.teacher_title} {term.teacher_name} {term.teacher_surname}",
+            "teacher_id": term.teacher_id,
+            "lesson_id": term.lesson_id,
+            "team_id": term.team_id,
+        }
+        for term in rows
+    ]
+
+
+def best_of(repeat, serialize, rows):
+    """
+    Time a serialization function, keeping the fastest of several runs.
+
+    Returns:
+        tuple[float, int]: The time in seconds and the size of the body.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = serialize(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--terms", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_sqlite_engine()
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        counts = seed_university(
+            db,
+            teachers=args.terms // 20 + 1,
+            lessons_per_teacher=20,
+            inspections=args.terms,
+        )
+        legacy_rows = legacy_terms(db)
+        current_rows = current_terms(db)
+    print(f"seeded: {counts}")
+
+    dict_adapter = TypeAdapter(list[dict])
+    term_adapter = TypeAdapter(list[InspectionTerm])
+    paths = {
+        "jsonable_encoder": (
+            lambda rows: json.dumps(jsonable_encoder(build_dicts(rows))).encode(),
+            legacy_rows,
+        ),
+        "orjson": (
+            lambda rows: orjson.dumps(jsonable_encoder(build_dicts(rows))),
+            legacy_rows,
+        ),
+        "hand-built dicts": (
+            lambda rows: dict_adapter.dump_json(
+                dict_adapter.validate_python(build_dicts(rows), from_attributes=True)
+            ),
+            legacy_rows,
+        ),
+        "typed model": (
+            lambda rows: term_adapter.dump_json(
+                term_adapter.validate_python(rows, from_attributes=True)
+            ),
+            current_rows,
+        ),
+        "row_dicts": (
+            lambda rows: dict_adapter.dump_json(
+                dict_adapter.validate_python(row_dicts(rows), from_attributes=True)
+            ),
+            current_rows,
+        ),
+    }
+
+    print(f"{'path':<20}{'ms':>10}{'bytes':>12}")
+    for name, (serialize, rows) in paths.items():
+        elapsed, size = best_of(args.repeat, serialize, rows)
+        print(f"{name:<20}{elapsed * 1000:>10.1f}{size:>12}")
+
+
+if __name__ == "__main__":
+    main()
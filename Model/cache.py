@@ -0,0 +1,354 @@
+"""
+Read-through cache for reference data endpoints.
+
+Cached values are grouped by tags naming the data they were computed from
+(``teachers``, ``teams``, ...). Every tag has a version number that is part of
+the cache keys, so invalidating a tag is a single increment: entries of the
+old version are simply never read again and age out of the backend.
+
+The backend is chosen with ``CACHE_URL``: ``memory://`` (default) keeps a
+TTL + LRU cache in the process, ``redis://host:port/db`` shares entries and
+tag versions between workers through any Redis-compatible server (requires
+the ``redis`` package). ``CACHE_TTL`` (seconds, default 300) and
+``CACHE_MAX_ENTRIES`` (default 1024) tune the in-process backend.
+
+The same tag versions back the ETags of ``conditional_get``: a response is
+unchanged as long as none of the tags it depends on has been invalidated.
+Tags are only bumped by the API's write endpoints, so changes made directly
+in the database are not seen until the affected tags are invalidated, and an
+ETag is only trusted for ``CACHE_TTL`` seconds, like a cached entry.
+
+The in-process backend only sees the invalidations of its own process. Cached
+entries then lag behind the other workers for at most ``CACHE_TTL``, but a
+304 would tell a client to keep a stale response, so with more than one
+worker (``WEB_CONCURRENCY``, the variable uvicorn and gunicorn read) and no
+Redis, ``conditional_get`` sends no ETag and never answers 304.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+MISSING = object()
+
+
+class MemoryBackend:
+    """
+    In-process cache evicting the least recently used entry when full.
+
+    Args:
+        max_entries (int): The maximum number of cached values.
+    """
+
+    # Tag versions are only seen by this process.
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        # Versions are per process, so ETags must not match another process.
+        self.epoch = uuid.uuid4().hex
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def version(self, tag):
+        with self._lock:
+            return self._versions.get(tag, 0)
+
+    def bump(self, tag):
+        with self._lock:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.epoch = uuid.uuid4().hex
+
+
+class RedisBackend:
+    """
+    Cache stored in a Redis-compatible server, shared by all workers.
+
+    Values are stored as JSON with the TTL enforced by the server.
+
+    Args:
+        client: A ``redis.Redis``-like client.
+        prefix (str): Namespace of the keys written by this cache.
+    """
+
+    shared = True
+
+    def __init__(self, client, prefix="inspections:cache:"):
+        self.client = client
+        self.prefix = prefix
+        self.epoch = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return MISSING if value is None else json.loads(value)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(int(ttl), 1))
+
+    def version(self, tag):
+        return int(self.client.get(f"{self.prefix}version:{tag}") or 0)
+
+    def bump(self, tag):
+        self.client.incr(f"{self.prefix}version:{tag}")
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+class NotModified(Exception):
+    """Raised when the client already holds the current version of a response."""
+
+    def __init__(self, etag):
+        super().__init__(etag)
+        self.etag = etag
+
+
+class ResponseCache:
+    """
+    Read-through cache with tag versions and hit/miss counters.
+
+    Args:
+        backend (MemoryBackend | RedisBackend): Where entries are stored.
+        ttl (float): Seconds an entry or ETag stays valid.
+        workers (int): The number of processes serving the API.
+    """
+
+    def __init__(self, backend, ttl=300, workers=1):
+        self.backend = backend
+        self.ttl = ttl
+        # Without a shared backend, another worker's write would go unseen.
+        self.conditional = backend.shared or workers == 1
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counters, name):
+        with self._lock:
+            counters[name] = counters.get(name, 0) + 1
+
+    def version(self, tag):
+        """Return the current version of a tag."""
+        return self.backend.version(tag)
+
+    def invalidate(self, *tags):
+        """Drop every cached value computed from any of the tags."""
+        for tag in tags:
+            self.backend.bump(tag)
+
+    def clear(self):
+        """Drop every cached value and tag version."""
+        self.backend.clear()
+        with self._lock:
+            self.hits.clear()
+            self.misses.clear()
+
+    def _lookup(self, name, tags, key):
+        versions = ",".join(f"{tag}={self.version(tag)}" for tag in tags)
+        full_key = f"{name}:{key}:{versions}"
+        value = self.backend.get(full_key)
+        self._count(self.misses if value is MISSING else self.hits, name)
+        return full_key, value
+
+    def _store(self, full_key, value):
+        value = jsonable_encoder(value)
+        self.backend.set(full_key, value, self.ttl)
+        return value
+
+    def get_or_compute(self, name, tags, key, compute):
+        """
+        Return the cached value for a key, computing and storing it on a miss.
+
+        Args:
+            name (str): The name the hit/miss counters are reported under.
+            tags (tuple[str, ...]): The tags the value depends on.
+            key (str): The key identifying the value within ``name``.
+            compute (Callable[[], Any]): Produces the value on a miss.
+
+        Returns:
+            Any: The JSON-compatible value.
+        """
+        full_key, value = self._lookup(name, tags, key)
+        if value is MISSING:
+            value = self._store(full_key, compute())
+        return value
+
+    async def get_or_compute_async(self, name, tags, key, compute):
+        """
+        Like ``get_or_compute``, with a coroutine function computing the value.
+        """
+        full_key, value = self._lookup(name, tags, key)
+        if value is MISSING:
+            value = self._store(full_key, await compute())
+        return value
+
+    def cached(self, *tags):
+        """
+        Decorate an endpoint so its result is cached until a tag is invalidated.
+
+        The cache key is made of the endpoint arguments except the ``db``
+        session. Both ``def`` and ``async def`` endpoints can be decorated.
+
+        Args:
+            *tags (str): The tags the endpoint result depends on.
+
+        Returns:
+            Callable: The decorator.
+        """
+
+        def cache_key(args, kwargs):
+            return json.dumps(
+                [args, {k: v for k, v in kwargs.items() if k != "db"}],
+                sort_keys=True,
+                default=str,
+            )
+
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    return await self.get_or_compute_async(
+                        func.__name__,
+                        tags,
+                        cache_key(args, kwargs),
+                        lambda: func(*args, **kwargs),
+                    )
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.get_or_compute(
+                    func.__name__,
+                    tags,
+                    cache_key(args, kwargs),
+                    lambda: func(*args, **kwargs),
+                )
+
+            return wrapper
+
+        return decorator
+
+    def etag(self, tags, request):
+        """
+        Compute the strong ETag of a response from its URL and tag versions.
+
+        The ETag also changes every ``ttl`` seconds, so changes the tags do not
+        track are picked up as late as cached entries are.
+
+        Args:
+            tags (tuple[str, ...]): The tags the response depends on.
+            request (Request): The request being answered.
+
+        Returns:
+            str: The quoted ETag.
+        """
+        versions = ",".join(f"{tag}={self.version(tag)}" for tag in tags)
+        query = sorted(request.query_params.multi_items())
+        period = int(time.time() // self.ttl)
+        identity = (
+            f"{self.backend.epoch}|{period}|{request.url.path}|{query}|{versions}"
+        )
+        return '"' + hashlib.sha1(identity.encode()).hexdigest() + '"'
+
+    def conditional_get(self, *tags):
+        """
+        Build a route dependency answering ``If-None-Match`` requests.
+
+        The ETag is computed before the endpoint runs; when the client sends a
+        matching ``If-None-Match`` header, ``NotModified`` is raised so the
+        endpoint (and its queries) are skipped and a 304 is returned. Unless
+        ``conditional`` is set, the dependency does nothing.
+
+        Args:
+            *tags (str): The tags the response depends on.
+
+        Returns:
+            Callable: A dependency for the route's ``dependencies`` list.
+        """
+
+        def dependency(request: Request, response: Response):
+            if not self.conditional:
+                return
+            etag = self.etag(tags, request)
+            if_none_match = request.headers.get("if-none-match", "")
+            candidates = {
+                candidate.strip().removeprefix("W/")
+                for candidate in if_none_match.split(",")
+            }
+            if etag in candidates or "*" in candidates:
+                raise NotModified(etag)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = "no-cache"
+
+        return dependency
+
+    def metrics(self):
+        """
+        Snapshot the hit and miss counters.
+
+        Returns:
+            dict[tuple[str, str], int]: Counts keyed by (metric, endpoint name).
+        """
+        with self._lock:
+            return {
+                **{("cache_hits_total", name): n for name, n in self.hits.items()},
+                **{("cache_misses_total", name): n for name, n in self.misses.items()},
+            }
+
+
+def create_cache(environ=os.environ):
+    """
+    Create the response cache configured by the environment.
+
+    Args:
+        environ (Mapping[str, str]): The environment to read.
+
+    Returns:
+        ResponseCache: The configured cache.
+    """
+    url = environ.get("CACHE_URL", "memory://")
+    ttl = float(environ.get("CACHE_TTL", 300))
+    workers = int(environ.get("WEB_CONCURRENCY", 1))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        backend = RedisBackend(redis.Redis.from_url(url))
+    else:
+        backend = MemoryBackend(int(environ.get("CACHE_MAX_ENTRIES", 1024)))
+    return ResponseCache(backend, ttl, workers)
@@ -0,0 +1,42 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from model_database_API import app, get_db, reference_cache
+from synthetic_data import create_sqlite_engine, seed_university
+
+
+@pytest.fixture(autouse=True)
+def clear_reference_cache():
+    reference_cache.clear()
+    yield
+    reference_cache.clear()
+
+
+@pytest.fixture
+def university():
+    # The size of the synthetic university; test modules override it.
+    return {"teachers": 20, "teams": 4, "subjects": 5, "inspections": 10}
+
+
+@pytest.fixture
+def engine(university):
+    engine = create_sqlite_engine()
+    with sessionmaker(bind=engine)() as db:
+        seed_university(db, **university)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    # Configured like SessionLocal.
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    def override_get_db():
+        with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
@@ -0,0 +1,57 @@
+"""
+Tables derived from other tables and rebuilt by the writes that change them.
+
+``TeacherBusySlot`` (``availability.py``), ``ScheduleEntry``
+(``schedule_snapshot.py``) and ``InspectionRollup`` (``analytics.py``) copy
+data kept elsewhere in a shape the hot read paths can use directly. Their
+refresh functions share one contract:
+
+- They run in the transaction of the write that made the rows stale and
+  never commit, so the copies change atomically with the data.
+- The API's sessions do not autoflush, so ``refresh`` flushes the session
+  first: the queries rebuilding the rows must see the pending write.
+- ``replace_rows`` deletes the stale rows and inserts the new ones.
+"""
+
+import functools
+
+from sqlalchemy import insert
+
+
+def refresh(func):
+    """
+    Decorate the refresh function of a derived table.
+
+    Args:
+        func (Callable): A function taking the session as its first argument.
+
+    Returns:
+        Callable: The function, flushing the session before it runs.
+    """
+
+    @functools.wraps(func)
+    def wrapper(db, *args, **kwargs):
+        db.flush()
+        return func(db, *args, **kwargs)
+
+    return wrapper
+
+
+def replace_rows(db, model, stale, rows):
+    """
+    Replace the stale rows of a derived table.
+
+    Args:
+        db (Session): The database session.
+        model (type): The model of the derived table.
+        stale (Delete): The DELETE of the rows being rebuilt.
+        rows (list[dict]): The new rows.
+
+    Returns:
+        int: The number of rows written.
+    """
+    db.execute(stale)
+    if rows:
+        # Rows with NULL columns stay in the same batch as the others.
+        db.execute(insert(model).execution_options(render_nulls=True), rows)
+    return len(rows)
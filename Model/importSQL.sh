@@ -36,6 +36,9 @@ else
     exit 1
 fi
 
+# Apply the schema migrations (indexes, constraints) on top of the structure
+python3 migrate.py || exit 1
+
 unset PGPASSWORD
 
 echo "Database setup complete."
@@ -0,0 +1,241 @@
+"""
+Background jobs run in worker processes.
+
+Semester-wide planning and report aggregation can take longer than a browser
+waits for a response, and would hold one of FastAPI's threadpool slots while
+they run. ``JobQueue`` runs them in a ``ProcessPoolExecutor`` instead: an
+endpoint submits the job and answers at once with its ID, and clients poll
+``/jobs/{job_id}/`` until ``/jobs/{job_id}/result/`` is ready. CPU-bound work
+thereby spreads over the cores without the GIL slowing down the interactive
+endpoints.
+
+Worker processes are started with the ``spawn`` method, so they inherit none
+of the API's threads or connections, and each opens its own engine from the
+database settings. A job is a module-level function taking a session as its
+first argument; its arguments and result must be picklable.
+
+Jobs are kept in the memory of the API process that accepted them, so with
+several API processes a job must be polled on the one that submitted it.
+
+Environment:
+    JOB_WORKERS     worker processes (default: the number of CPUs)
+    JOB_HISTORY     finished jobs kept for polling (default 1000)
+"""
+
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+
+from database import create_configured_engine
+from sqlalchemy.orm import sessionmaker
+
+# Set in every worker process by ``init_worker``.
+worker_sessions = None
+
+
+def init_worker(settings):
+    """
+    Open the database engine of a worker process.
+
+    Args:
+        settings (DatabaseSettings): The database settings of the API.
+    """
+    global worker_sessions
+    worker_sessions = sessionmaker(
+        bind=create_configured_engine(settings), autoflush=False
+    )
+
+
+def run_job(function, args):
+    """Run a job function in a new session of the worker process."""
+    with worker_sessions() as db:
+        return function(db, *args)
+
+
+class Job:
+    """
+    A submitted job and its future.
+
+    Args:
+        name (str): The kind of job, e.g. ``inspection-plan``.
+        future (Future): The future of the job's execution.
+        invalidates (tuple[str, ...]): The cache tags to invalidate when the
+            job succeeds.
+    """
+
+    def __init__(self, name, future, invalidates=()):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.future = future
+        self.invalidates = invalidates
+        self.submitted_at = datetime.now(timezone.utc)
+        self.finished_at = None
+
+    @property
+    def status(self):
+        if not self.future.done():
+            return "running" if self.future.running() else "pending"
+        if self.future.cancelled() or self.future.exception() is not None:
+            return "failed"
+        return "succeeded"
+
+    def error(self):
+        """Return the message of the exception that failed the job, if any."""
+        if self.status != "failed":
+            return None
+        if self.future.cancelled():
+            return "Job was cancelled."
+        exception = self.future.exception()
+        return str(exception) or type(exception).__name__
+
+    def describe(self):
+        """
+        Describe the job for the polling endpoints.
+
+        Returns:
+            dict: The ID, name, status, submission and completion times of the
+                job, and the error that failed it.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "error": self.error(),
+        }
+
+
+class JobQueue:
+    """
+    Jobs submitted to a pool of worker processes.
+
+    The pool is started by the first submission, so importing the API does not
+    spawn processes. A worker dying abruptly, e.g. killed for its memory, breaks
+    the whole pool: the jobs it was running fail and the next submission
+    replaces the pool.
+
+    Args:
+        settings (DatabaseSettings): The database settings the workers use.
+        max_workers (int | None): The number of worker processes, or None for
+            one per CPU.
+        history (int): The number of finished jobs kept for polling.
+        on_success (Callable[[tuple[str, ...]], None] | None): Called in the
+            API process with the cache tags of every job that succeeds.
+    """
+
+    def __init__(self, settings, max_workers=None, history=1000, on_success=None):
+        self.settings = settings
+        self.max_workers = max_workers
+        self.history = history
+        self.on_success = on_success
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                    initargs=(self.settings,),
+                )
+            return self._executor
+
+    def submit(self, name, function, *args, invalidates=()):
+        """
+        Run a job in a worker process.
+
+        Args:
+            name (str): The kind of job.
+            function (Callable): A module-level function called with a session
+                and ``args``.
+            *args: The picklable arguments of the function.
+            invalidates (tuple[str, ...]): The cache tags to invalidate when the
+                job succeeds.
+
+        Returns:
+            Job: The submitted job.
+        """
+        executor = self._get_executor()
+        try:
+            future = executor.submit(run_job, function, args)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            future = self._get_executor().submit(run_job, function, args)
+        job = Job(name, future, invalidates)
+        with self._lock:
+            self._jobs[job.id] = job
+        future.add_done_callback(lambda _: self._finished(job))
+        return job
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finished(self, job):
+        job.finished_at = datetime.now(timezone.utc)
+        if job.status == "succeeded" and job.invalidates and self.on_success:
+            self.on_success(job.invalidates)
+        with self._lock:
+            finished = [
+                job_id for job_id, kept in self._jobs.items() if kept.future.done()
+            ]
+            for job_id in finished[: max(len(finished) - self.history, 0)]:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return the job with an ID, or None if it is unknown or forgotten."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def metrics(self):
+        """
+        Count the kept jobs by status.
+
+        Returns:
+            dict[str, int]: The number of jobs per status.
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = dict.fromkeys(("pending", "running", "succeeded", "failed"), 0)
+        for job in jobs:
+            counts[job.status] += 1
+        return counts
+
+    def shutdown(self):
+        """Stop the worker processes, cancelling the jobs not yet started."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def create_job_queue(settings, on_success=None, environ=os.environ):
+    """
+    Create the job queue configured by the environment.
+
+    Args:
+        settings (DatabaseSettings): The database settings the workers use.
+        on_success (Callable[[tuple[str, ...]], None] | None): Called with the
+            cache tags of every job that succeeds.
+        environ (Mapping[str, str]): The environment to read.
+
+    Returns:
+        JobQueue: The configured queue.
+    """
+    workers = environ.get("JOB_WORKERS")
+    return JobQueue(
+        settings,
+        max_workers=int(workers) if workers else None,
+        history=int(environ.get("JOB_HISTORY", 1000)),
+        on_success=on_success,
+    )
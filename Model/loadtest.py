@@ -0,0 +1,91 @@
+"""
+Load test for the read endpoints of the API.
+
+Seed a SQLite stand-in database, start the API against it in sync or async
+mode, then hammer an endpoint with concurrent clients:
+
+    python loadtest.py seed loadtest.db
+    DATABASE_URL=sqlite:///loadtest.db python model_database_API.py
+    DATABASE_URL=sqlite:///loadtest.db \\
+        ASYNC_DATABASE_URL=sqlite+aiosqlite:///loadtest.db python model_database_API.py
+    python loadtest.py run http://localhost:5000/inspection-teams/ --clients 200
+
+The same works against PostgreSQL with ``postgresql+asyncpg://`` as the async URL.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy.orm import sessionmaker
+from synthetic_data import create_sqlite_engine, seed_university
+
+
+async def client_loop(client, url, requests, latencies, errors):
+    for _ in range(requests):
+        started = time.perf_counter()
+        try:
+            response = await client.get(url)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(url, clients, requests):
+    """
+    Send ``clients * requests`` GET requests, ``clients`` at a time.
+
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds and error count.
+    """
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                client_loop(client, url, requests, latencies, errors)
+                for _ in range(clients)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentiles[49] * 1000, 1),
+        "p99_ms": round(percentiles[98] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="create a seeded SQLite database")
+    seed.add_argument("path")
+    seed.add_argument("--teachers", type=int, default=1000)
+    seed.add_argument("--teams", type=int, default=200)
+
+    load = commands.add_parser("run", help="load test an endpoint")
+    load.add_argument("url")
+    load.add_argument("--clients", type=int, default=200)
+    load.add_argument("--requests", type=int, default=20, help="per client")
+
+    args = parser.parse_args()
+    if args.command == "seed":
+        engine = create_sqlite_engine(f"sqlite:///{args.path}")
+        with sessionmaker(bind=engine)() as db:
+            print(seed_university(db, teachers=args.teachers, teams=args.teams))
+    else:
+        print(asyncio.run(run(args.url, args.clients, args.requests)))
+
+
+if __name__ == "__main__":
+    main()
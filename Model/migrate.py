@@ -0,0 +1,123 @@
+"""
+Versioned schema migrations.
+
+Migrations are the PostgreSQL scripts in ``migrations/`` named
+``NNN_description.sql``. They are applied in version order, each in its own
+transaction, to the database configured by ``DATABASE_URL`` (see
+``database.py``), and every applied version is recorded in the
+``SchemaMigration`` table, so running the script again only applies new files:
+
+    python migrate.py           apply pending migrations
+    python migrate.py --list    show the applied and pending migrations
+
+``importSQL.sh`` and ``ImportSQL.bat`` run it after importing ``drawSQL.sql``.
+The SQLAlchemy models declare the same indexes, so databases created with
+``Base.metadata.create_all`` (such as the SQLite test databases) match.
+"""
+
+import argparse
+import os
+import re
+
+from database import load_settings
+from sqlalchemy import create_engine, text
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def migration_files(directory=MIGRATIONS_DIR):
+    """
+    List the migration scripts of a directory.
+
+    Args:
+        directory (str): The directory holding the scripts.
+
+    Returns:
+        list[tuple[int, str, str]]: (version, name, path) sorted by version.
+    """
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(
+                (int(match[1]), match[2], os.path.join(directory, filename))
+            )
+    return sorted(migrations)
+
+
+def applied_versions(connection):
+    """
+    Return the versions already applied, creating the bookkeeping table if needed.
+
+    Args:
+        connection (Connection): A connection to the database.
+
+    Returns:
+        set[int]: The applied versions.
+    """
+    connection.execute(
+        text(
+            'CREATE TABLE IF NOT EXISTS "SchemaMigration"('
+            '"version" INTEGER PRIMARY KEY, '
+            '"name" TEXT NOT NULL, '
+            '"applied_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)'
+        )
+    )
+    return set(
+        connection.execute(text('SELECT "version" FROM "SchemaMigration"')).scalars()
+    )
+
+
+def migrate(engine, directory=MIGRATIONS_DIR):
+    """
+    Apply the pending migrations in version order.
+
+    Args:
+        engine (Engine): The engine of the database to migrate.
+        directory (str): The directory holding the scripts.
+
+    Returns:
+        list[str]: The names of the migrations applied.
+    """
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+
+    applied = []
+    for version, name, path in migration_files(directory):
+        if version in done:
+            continue
+        with open(path, encoding="utf-8") as file:
+            script = file.read()
+        with engine.begin() as connection:
+            connection.exec_driver_sql(script)
+            connection.execute(
+                text(
+                    'INSERT INTO "SchemaMigration"("version", "name") VALUES (:v, :n)'
+                ),
+                {"v": version, "n": name},
+            )
+        applied.append(f"{version:03d}_{name}")
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--list", action="store_true", help="only list migrations")
+    args = parser.parse_args()
+
+    engine = create_engine(load_settings().url)
+    if args.list:
+        with engine.begin() as connection:
+            done = applied_versions(connection)
+        for version, name, _ in migration_files():
+            status = "applied" if version in done else "pending"
+            print(f"{version:03d}_{name}: {status}")
+    else:
+        for name in migrate(engine):
+            print(f"applied {name}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
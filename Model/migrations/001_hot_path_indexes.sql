@@ -0,0 +1,23 @@
+-- Secondary indexes for the columns the API filters and joins on.
+
+CREATE INDEX IF NOT EXISTS "lesson_time_index" ON "Lesson"("time");
+CREATE INDEX IF NOT EXISTS "lesson_fk_teacher_index" ON "Lesson"("fk_teacher");
+CREATE INDEX IF NOT EXISTS "lesson_fk_subject_index" ON "Lesson"("fk_subject");
+
+CREATE INDEX IF NOT EXISTS "inspection_fk_lesson_index" ON "Inspection"("fk_lesson");
+CREATE INDEX IF NOT EXISTS "inspection_fk_inspectionteam_index" ON "Inspection"("fk_inspectionTeam");
+CREATE INDEX IF NOT EXISTS "inspection_fk_inspectionschedule_index" ON "Inspection"("fk_inspectionSchedule");
+
+CREATE INDEX IF NOT EXISTS "inspectionschedule_year_semester_index" ON "InspectionSchedule"("year_semester");
+
+-- A teacher can be a member of a team only once; drop existing duplicates
+-- before enforcing it.
+DELETE FROM "TeacherInspectionTeam"
+WHERE "id" NOT IN (
+    SELECT MIN("id")
+    FROM "TeacherInspectionTeam"
+    GROUP BY "fk_inspectionTeam", "fk_teacher"
+);
+CREATE UNIQUE INDEX IF NOT EXISTS "teacherinspectionteam_team_teacher_unique"
+    ON "TeacherInspectionTeam"("fk_inspectionTeam", "fk_teacher");
+CREATE INDEX IF NOT EXISTS "teacherinspectionteam_fk_teacher_index" ON "TeacherInspectionTeam"("fk_teacher");
@@ -0,0 +1,41 @@
+-- Keep the number of members on the team row instead of counting them on
+-- every insert. The counter is updated by a trigger, so concurrent adds to a
+-- team serialize on the team row lock, and the check constraint guarantees
+-- the limit of 3 members can never be exceeded.
+
+ALTER TABLE "InspectionTeam" ADD COLUMN "member_count" INTEGER NOT NULL DEFAULT 0;
+
+UPDATE "InspectionTeam"
+SET "member_count" = (
+    SELECT COUNT(*)
+    FROM "TeacherInspectionTeam"
+    WHERE "TeacherInspectionTeam"."fk_inspectionTeam" = "InspectionTeam"."id"
+);
+
+ALTER TABLE "InspectionTeam" ADD CONSTRAINT "inspectionteam_member_count_check"
+    CHECK ("member_count" BETWEEN 0 AND 3);
+
+DROP TRIGGER IF EXISTS enforce_teacher_limit_trigger ON "TeacherInspectionTeam";
+DROP FUNCTION IF EXISTS enforce_teacher_limit();
+
+CREATE OR REPLACE FUNCTION maintain_team_member_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE "InspectionTeam"
+        SET "member_count" = "member_count" - 1
+        WHERE "id" = OLD."fk_inspectionTeam";
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE "InspectionTeam"
+        SET "member_count" = "member_count" + 1
+        WHERE "id" = NEW."fk_inspectionTeam";
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER maintain_team_member_count_trigger
+AFTER INSERT OR DELETE OR UPDATE OF "fk_inspectionTeam" ON "TeacherInspectionTeam"
+FOR EACH ROW
+EXECUTE FUNCTION maintain_team_member_count();
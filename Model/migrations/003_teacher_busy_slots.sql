@@ -0,0 +1,41 @@
+-- Time ranges during which teachers teach or inspect a lesson, probed by the
+-- availability checks. The API rebuilds the rows of the teachers affected by
+-- its writes; POST /busy-slots/refresh/ rebuilds all of them.
+
+CREATE TABLE "TeacherBusySlot"(
+    "id" bigserial NOT NULL,
+    "fk_teacher" BIGINT NOT NULL,
+    "starts_at" TIMESTAMP(0) WITHOUT TIME ZONE NOT NULL,
+    "ends_at" TIMESTAMP(0) WITHOUT TIME ZONE NOT NULL,
+    "source" VARCHAR(255) CHECK
+        (
+            "source" IN(
+                'teaching',
+                'inspecting'
+            )
+        ) NOT NULL,
+        "fk_lesson" BIGINT NOT NULL,
+        "fk_inspectionTeam" BIGINT NULL
+);
+ALTER TABLE
+    "TeacherBusySlot" ADD PRIMARY KEY("id");
+ALTER TABLE
+    "TeacherBusySlot" ADD CONSTRAINT "teacherbusyslot_fk_teacher_foreign" FOREIGN KEY("fk_teacher") REFERENCES "Teacher"("id");
+ALTER TABLE
+    "TeacherBusySlot" ADD CONSTRAINT "teacherbusyslot_fk_lesson_foreign" FOREIGN KEY("fk_lesson") REFERENCES "Lesson"("id");
+ALTER TABLE
+    "TeacherBusySlot" ADD CONSTRAINT "teacherbusyslot_fk_inspectionteam_foreign" FOREIGN KEY("fk_inspectionTeam") REFERENCES "InspectionTeam"("id");
+
+-- Lessons last 90 minutes (availability.LESSON_DURATION).
+INSERT INTO "TeacherBusySlot"("fk_teacher", "starts_at", "ends_at", "source", "fk_lesson")
+SELECT "fk_teacher", "time", "time" + INTERVAL '90 minutes', 'teaching', "id"
+FROM "Lesson";
+
+INSERT INTO "TeacherBusySlot"("fk_teacher", "starts_at", "ends_at", "source", "fk_lesson", "fk_inspectionTeam")
+SELECT tit."fk_teacher", l."time", l."time" + INTERVAL '90 minutes', 'inspecting', l."id", i."fk_inspectionTeam"
+FROM "Inspection" i
+JOIN "TeacherInspectionTeam" tit ON tit."fk_inspectionTeam" = i."fk_inspectionTeam"
+JOIN "Lesson" l ON l."id" = i."fk_lesson";
+
+CREATE INDEX IF NOT EXISTS "teacherbusyslot_starts_at_index" ON "TeacherBusySlot"("starts_at", "fk_teacher");
+CREATE INDEX IF NOT EXISTS "teacherbusyslot_fk_teacher_index" ON "TeacherBusySlot"("fk_teacher");
@@ -0,0 +1,62 @@
+-- Denormalized inspection schedule read by GET /schedule/. The API rebuilds
+-- the entries of the lessons affected by its writes; POST /schedule/refresh/
+-- rebuilds all of them.
+
+CREATE TABLE "ScheduleEntry"(
+    "id" bigserial NOT NULL,
+    "year_semester" VARCHAR(255) NOT NULL,
+    "fk_inspection" BIGINT NOT NULL,
+    "fk_lesson" BIGINT NOT NULL,
+    "fk_inspectionTeam" BIGINT NULL,
+    "lesson_time" TIMESTAMP(0) WITHOUT TIME ZONE NOT NULL,
+    "room" TEXT NOT NULL,
+    "building" VARCHAR(255) NOT NULL,
+    "subject_name" TEXT NOT NULL,
+    "subject_type" VARCHAR(255) NOT NULL,
+    "teacher_title" VARCHAR(255) NOT NULL,
+    "teacher_name" TEXT NOT NULL,
+    "teacher_surname" TEXT NOT NULL,
+    "inspection_team" JSON NOT NULL,
+    "refreshed_at" TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
+ALTER TABLE
+    "ScheduleEntry" ADD PRIMARY KEY("id");
+ALTER TABLE
+    "ScheduleEntry" ADD CONSTRAINT "scheduleentry_fk_inspection_foreign" FOREIGN KEY("fk_inspection") REFERENCES "Inspection"("id") ON DELETE CASCADE;
+ALTER TABLE
+    "ScheduleEntry" ADD CONSTRAINT "scheduleentry_fk_lesson_foreign" FOREIGN KEY("fk_lesson") REFERENCES "Lesson"("id");
+ALTER TABLE
+    "ScheduleEntry" ADD CONSTRAINT "scheduleentry_fk_inspectionteam_foreign" FOREIGN KEY("fk_inspectionTeam") REFERENCES "InspectionTeam"("id");
+
+INSERT INTO "ScheduleEntry"(
+    "year_semester", "fk_inspection", "fk_lesson", "fk_inspectionTeam",
+    "lesson_time", "room", "building", "subject_name", "subject_type",
+    "teacher_title", "teacher_name", "teacher_surname", "inspection_team",
+    "refreshed_at"
+)
+SELECT
+    s."year_semester", i."id", l."id", i."fk_inspectionTeam",
+    l."time", l."room", l."building", sub."name", sub."type",
+    t."title", t."name", t."surname",
+    COALESCE(
+        (
+            SELECT json_agg(
+                json_build_object('title', m."title", 'name', m."name", 'surname', m."surname")
+                ORDER BY tit."id"
+            )
+            FROM "TeacherInspectionTeam" tit
+            JOIN "Teacher" m ON m."id" = tit."fk_teacher"
+            WHERE tit."fk_inspectionTeam" = i."fk_inspectionTeam"
+        ),
+        '[]'::json
+    ),
+    NOW() AT TIME ZONE 'UTC'
+FROM "Inspection" i
+JOIN "InspectionSchedule" s ON s."id" = i."fk_inspectionSchedule"
+JOIN "Lesson" l ON l."id" = i."fk_lesson"
+JOIN "Subject" sub ON sub."id" = l."fk_subject"
+JOIN "Teacher" t ON t."id" = l."fk_teacher";
+
+CREATE INDEX IF NOT EXISTS "scheduleentry_year_semester_lesson_time_index"
+    ON "ScheduleEntry"("year_semester", "lesson_time", "fk_lesson");
+CREATE INDEX IF NOT EXISTS "scheduleentry_fk_lesson_index" ON "ScheduleEntry"("fk_lesson");
@@ -0,0 +1,38 @@
+-- Tie every lesson to the semester it is taught in, so a semester's lessons
+-- are one range of the (year_semester, time) index instead of a scan of the
+-- whole timetable. The winter semester runs from October to mid-February and
+-- is named after the year it starts in; the summer semester covers the rest.
+
+CREATE OR REPLACE FUNCTION lesson_semester(lesson_time TIMESTAMP)
+RETURNS VARCHAR AS $$
+    SELECT CASE
+        WHEN EXTRACT(MONTH FROM lesson_time) >= 10
+            THEN 'Winter ' || EXTRACT(YEAR FROM lesson_time)::INTEGER
+        WHEN EXTRACT(MONTH FROM lesson_time) = 1
+            OR (EXTRACT(MONTH FROM lesson_time) = 2 AND EXTRACT(DAY FROM lesson_time) < 15)
+            THEN 'Winter ' || (EXTRACT(YEAR FROM lesson_time)::INTEGER - 1)
+        ELSE 'Summer ' || EXTRACT(YEAR FROM lesson_time)::INTEGER
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+ALTER TABLE "Lesson" ADD COLUMN "year_semester" VARCHAR(255) NULL;
+
+UPDATE "Lesson" SET "year_semester" = lesson_semester("time");
+
+CREATE OR REPLACE FUNCTION set_lesson_semester()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW."year_semester" IS NOT NULL THEN
+        RETURN NEW;
+    END IF;
+    NEW."year_semester" := lesson_semester(NEW."time");
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER set_lesson_semester_trigger
+BEFORE INSERT OR UPDATE OF "time" ON "Lesson"
+FOR EACH ROW
+EXECUTE FUNCTION set_lesson_semester();
+
+CREATE INDEX IF NOT EXISTS "lesson_year_semester_time_index" ON "Lesson"("year_semester", "time", "id");
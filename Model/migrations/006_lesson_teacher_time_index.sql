@@ -0,0 +1,7 @@
+-- Upcoming lessons of a teacher (GET /lesson_with_dates/ and
+-- GET /unique-subjects/) are a range of this index. It also serves every
+-- lookup the single-column teacher index did, so that one is dropped.
+
+CREATE INDEX IF NOT EXISTS "lesson_fk_teacher_time_index" ON "Lesson"("fk_teacher", "time");
+
+DROP INDEX IF EXISTS "lesson_fk_teacher_index";
@@ -0,0 +1,65 @@
+-- Per-semester rollups of the inspection reports read by GET /inspection-stats/.
+-- Each row adds up the reports of one group (a department, subject type or
+-- building, or the whole semester) as counts and sums, so averages and the
+-- lateness distribution are read without scanning the reports. The API
+-- recomputes the groups of the lessons its writes affect;
+-- POST /inspection-stats/refresh/ recomputes all of them.
+
+CREATE TABLE "InspectionRollup"(
+    "id" bigserial NOT NULL,
+    "year_semester" VARCHAR(255) NOT NULL,
+    "dimension" VARCHAR(255) NOT NULL,
+    "group_value" VARCHAR(255) NOT NULL,
+    "reports" INTEGER NOT NULL,
+    "final_rating_sum" BIGINT NOT NULL,
+    "lateness_reports" INTEGER NOT NULL,
+    "lateness_minutes_sum" BIGINT NOT NULL,
+    "on_time" INTEGER NOT NULL,
+    "late_1_5" INTEGER NOT NULL,
+    "late_6_15" INTEGER NOT NULL,
+    "late_over_15" INTEGER NOT NULL,
+    "refreshed_at" TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
+ALTER TABLE
+    "InspectionRollup" ADD PRIMARY KEY("id");
+
+CREATE UNIQUE INDEX IF NOT EXISTS "inspectionrollup_semester_dimension_group_unique"
+    ON "InspectionRollup"("year_semester", "dimension", "group_value");
+
+WITH "reports" AS (
+    SELECT l."year_semester", t."department", sub."type", l."building",
+        r."final_rating", r."lateness_minutes"
+    FROM "Inspection" i
+    JOIN "InspectionReport" r ON r."id" = i."fk_inspectionReport"
+    JOIN "Lesson" l ON l."id" = i."fk_lesson"
+    JOIN "Subject" sub ON sub."id" = l."fk_subject"
+    JOIN "Teacher" t ON t."id" = l."fk_teacher"
+    WHERE l."year_semester" IS NOT NULL
+), "groups" AS (
+    SELECT "year_semester", 'department' AS "dimension", "department" AS "group_value",
+        "final_rating", "lateness_minutes" FROM "reports"
+    UNION ALL
+    SELECT "year_semester", 'subject_type', "type", "final_rating", "lateness_minutes"
+    FROM "reports"
+    UNION ALL
+    SELECT "year_semester", 'building', "building", "final_rating", "lateness_minutes"
+    FROM "reports"
+    UNION ALL
+    SELECT "year_semester", 'semester', "year_semester", "final_rating", "lateness_minutes"
+    FROM "reports"
+)
+INSERT INTO "InspectionRollup"(
+    "year_semester", "dimension", "group_value", "reports", "final_rating_sum",
+    "lateness_reports", "lateness_minutes_sum", "on_time", "late_1_5",
+    "late_6_15", "late_over_15", "refreshed_at"
+)
+SELECT
+    "year_semester", "dimension", "group_value", COUNT(*), SUM("final_rating"),
+    COUNT("lateness_minutes"), COALESCE(SUM("lateness_minutes"), 0),
+    COUNT(*) FILTER (WHERE "lateness_minutes" <= 0),
+    COUNT(*) FILTER (WHERE "lateness_minutes" BETWEEN 1 AND 5),
+    COUNT(*) FILTER (WHERE "lateness_minutes" BETWEEN 6 AND 15),
+    COUNT(*) FILTER (WHERE "lateness_minutes" > 15),
+    NOW() AT TIME ZONE 'UTC'
+FROM "groups"
+GROUP BY "year_semester", "dimension", "group_value";
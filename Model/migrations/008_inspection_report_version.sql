@@ -0,0 +1,6 @@
+-- Optimistic concurrency for POST /inspection-docs/{docs_id}/edit/. Every edit
+-- increments the version of the report; GET /inspection-docs/{docs_id}/ sends
+-- it as the ETag, and an edit with an If-Match header only applies while the
+-- report still has that version.
+
+ALTER TABLE "InspectionReport" ADD COLUMN "version" INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,8 @@
+-- GET /schedule/ keeps the first entry of every lesson, so the entries are
+-- ordered down to the inspection for every backend to keep the same one. The
+-- index gains the column to keep serving that order.
+
+CREATE INDEX IF NOT EXISTS "scheduleentry_semester_time_lesson_inspection_index"
+    ON "ScheduleEntry"("year_semester", "lesson_time", "fk_lesson", "fk_inspection");
+
+DROP INDEX IF EXISTS "scheduleentry_year_semester_lesson_time_index";
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -40,11 +42,17 @@ class SubjectBase(BaseModel):
 
 class LessonBase(BaseModel):
     id: int
-    time: str
+    time: datetime
     room: str
     building: str
     fk_subject: int
     fk_teacher: int
+    year_semester: str | None
+
+
+class LessonPage(BaseModel):
+    items: list[LessonBase]
+    next_cursor: str | None
 
 
 class InspectionScheduleBase(BaseModel):
@@ -93,6 +101,13 @@ class CreateInspection(BaseModel):
     fk_inspectionTeam: int
 
 
+class PlanInspections(BaseModel):
+    semester: str
+    lesson_ids: list[int]
+    max_inspections_per_team: int | None = None
+    dry_run: bool = False
+
+
 class InspectionBase(BaseModel):
     fk_inspectionSchedule: int
     fk_inspectionTeam: int | None
@@ -1,8 +1,21 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import (
+    DDL,
+    CheckConstraint,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    String,
+    event,
+)
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
 
+MAX_TEAM_MEMBERS = 3
+
 
 class Teacher(Base):
     __tablename__ = "Teacher"
@@ -18,8 +31,15 @@ class Teacher(Base):
 
 class InspectionTeam(Base):
     __tablename__ = "InspectionTeam"
+    __table_args__ = (
+        CheckConstraint(
+            f'"member_count" BETWEEN 0 AND {MAX_TEAM_MEMBERS}',
+            name="inspectionteam_member_count_check",
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, nullable=False)
+    member_count = Column(Integer, nullable=False, default=0, server_default="0")
     teachers = relationship("TeacherInspectionTeam", back_populates="inspection_team")
     inspections = relationship("Inspection", back_populates="inspection_team")
     teachers = relationship("TeacherInspectionTeam", back_populates="inspection_team")
@@ -27,6 +47,15 @@ class InspectionTeam(Base):
 
 class TeacherInspectionTeam(Base):
     __tablename__ = "TeacherInspectionTeam"
+    __table_args__ = (
+        Index(
+            "teacherinspectionteam_team_teacher_unique",
+            "fk_inspectionTeam",
+            "fk_teacher",
+            unique=True,
+        ),
+        Index("teacherinspectionteam_fk_teacher_index", "fk_teacher"),
+    )
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     fk_teacher = Column(Integer, ForeignKey("Teacher.id"), nullable=False)
     fk_inspectionTeam = Column(Integer, ForeignKey("InspectionTeam.id"), nullable=False)
@@ -34,6 +63,43 @@ class TeacherInspectionTeam(Base):
     inspection_team = relationship("InspectionTeam", back_populates="teachers")
 
 
+# PostgreSQL databases get the counter trigger from migrations/002; databases
+# created from the models (SQLite) get the same behaviour here.
+for trigger in (
+    """
+    CREATE TRIGGER maintain_team_member_count_insert
+    AFTER INSERT ON "TeacherInspectionTeam"
+    BEGIN
+        UPDATE "InspectionTeam" SET "member_count" = "member_count" + 1
+        WHERE "id" = NEW."fk_inspectionTeam";
+    END
+    """,
+    """
+    CREATE TRIGGER maintain_team_member_count_delete
+    AFTER DELETE ON "TeacherInspectionTeam"
+    BEGIN
+        UPDATE "InspectionTeam" SET "member_count" = "member_count" - 1
+        WHERE "id" = OLD."fk_inspectionTeam";
+    END
+    """,
+    """
+    CREATE TRIGGER maintain_team_member_count_update
+    AFTER UPDATE OF "fk_inspectionTeam" ON "TeacherInspectionTeam"
+    BEGIN
+        UPDATE "InspectionTeam" SET "member_count" = "member_count" - 1
+        WHERE "id" = OLD."fk_inspectionTeam";
+        UPDATE "InspectionTeam" SET "member_count" = "member_count" + 1
+        WHERE "id" = NEW."fk_inspectionTeam";
+    END
+    """,
+):
+    event.listen(
+        TeacherInspectionTeam.__table__,
+        "after_create",
+        DDL(trigger).execute_if(dialect="sqlite"),
+    )
+
+
 class Subject(Base):
     __tablename__ = "Subject"
     id = Column(Integer, primary_key=True, index=True)
@@ -46,13 +112,21 @@ class Subject(Base):
 
 class Lesson(Base):
     __tablename__ = "Lesson"
+    __table_args__ = (
+        Index("lesson_time_index", "time"),
+        Index("lesson_fk_teacher_time_index", "fk_teacher", "time"),
+        Index("lesson_fk_subject_index", "fk_subject"),
+        Index("lesson_year_semester_time_index", "year_semester", "time", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    time = Column(String, nullable=False)
+    time = Column(DateTime, nullable=False)
     room = Column(String, nullable=False)
     building = Column(String, nullable=False)
     fk_subject = Column(Integer, ForeignKey("Subject.id"), nullable=False)
     fk_teacher = Column(Integer, ForeignKey("Teacher.id"), nullable=False)
+    # Derived from the time by a trigger in PostgreSQL (migration 005).
+    year_semester = Column(String, nullable=True)
 
     subject = relationship("Subject", back_populates="lessons")
     teacher = relationship("Teacher", back_populates="lessons")
@@ -61,6 +135,7 @@ class Lesson(Base):
 
 class InspectionSchedule(Base):
     __tablename__ = "InspectionSchedule"
+    __table_args__ = (Index("inspectionschedule_year_semester_index", "year_semester"),)
 
     id = Column(Integer, primary_key=True, index=True)
     year_semester = Column(String, nullable=False)
@@ -84,6 +159,11 @@ class Administrator(Base):
 
 class Inspection(Base):
     __tablename__ = "Inspection"
+    __table_args__ = (
+        Index("inspection_fk_lesson_index", "fk_lesson"),
+        Index("inspection_fk_inspectionteam_index", "fk_inspectionTeam"),
+        Index("inspection_fk_inspectionschedule_index", "fk_inspectionSchedule"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     fk_inspectionSchedule = Column(
@@ -115,6 +195,7 @@ class InspectionReport(Base):
     substantive_rating = Column(String, nullable=False)
     final_rating = Column(Integer, nullable=False)
     objection = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     inspections = relationship("Inspection", back_populates="inspection_report")
 
@@ -132,3 +213,82 @@ class TeacherInspectionReport(Base):
     inspection_report = relationship(
         "InspectionReport", backref="teacher_inspection_reports"
     )
+
+
+class TeacherBusySlot(Base):
+    __tablename__ = "TeacherBusySlot"
+    __table_args__ = (
+        Index("teacherbusyslot_starts_at_index", "starts_at", "fk_teacher"),
+        Index("teacherbusyslot_fk_teacher_index", "fk_teacher"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    fk_teacher = Column(Integer, ForeignKey("Teacher.id"), nullable=False)
+    starts_at = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime, nullable=False)
+    source = Column(String, nullable=False)
+    fk_lesson = Column(Integer, ForeignKey("Lesson.id"), nullable=False)
+    fk_inspectionTeam = Column(Integer, ForeignKey("InspectionTeam.id"), nullable=True)
+
+    teacher = relationship("Teacher")
+    lesson = relationship("Lesson")
+
+
+class ScheduleEntry(Base):
+    __tablename__ = "ScheduleEntry"
+    __table_args__ = (
+        Index(
+            "scheduleentry_semester_time_lesson_inspection_index",
+            "year_semester",
+            "lesson_time",
+            "fk_lesson",
+            "fk_inspection",
+        ),
+        Index("scheduleentry_fk_lesson_index", "fk_lesson"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    year_semester = Column(String, nullable=False)
+    fk_inspection = Column(
+        Integer, ForeignKey("Inspection.id", ondelete="CASCADE"), nullable=False
+    )
+    fk_lesson = Column(Integer, ForeignKey("Lesson.id"), nullable=False)
+    fk_inspectionTeam = Column(Integer, ForeignKey("InspectionTeam.id"), nullable=True)
+    lesson_time = Column(DateTime, nullable=False)
+    room = Column(String, nullable=False)
+    building = Column(String, nullable=False)
+    subject_name = Column(String, nullable=False)
+    subject_type = Column(String, nullable=False)
+    teacher_title = Column(String, nullable=False)
+    teacher_name = Column(String, nullable=False)
+    teacher_surname = Column(String, nullable=False)
+    inspection_team = Column(JSON, nullable=False)
+    refreshed_at = Column(DateTime, nullable=False)
+
+
+class InspectionRollup(Base):
+    __tablename__ = "InspectionRollup"
+    __table_args__ = (
+        Index(
+            "inspectionrollup_semester_dimension_group_unique",
+            "year_semester",
+            "dimension",
+            "group_value",
+            unique=True,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    year_semester = Column(String, nullable=False)
+    # department, subject_type, building or semester (the whole semester).
+    dimension = Column(String, nullable=False)
+    group_value = Column(String, nullable=False)
+    reports = Column(Integer, nullable=False)
+    final_rating_sum = Column(Integer, nullable=False)
+    lateness_reports = Column(Integer, nullable=False)
+    lateness_minutes_sum = Column(Integer, nullable=False)
+    on_time = Column(Integer, nullable=False)
+    late_1_5 = Column(Integer, nullable=False)
+    late_6_15 = Column(Integer, nullable=False)
+    late_over_15 = Column(Integer, nullable=False)
+    refreshed_at = Column(DateTime, nullable=False)
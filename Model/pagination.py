@@ -0,0 +1,134 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from models_sqlalchemy import Inspection, InspectionSchedule, Lesson, Subject
+from sqlalchemy import and_, or_
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(time, row_id):
+    """
+    Encode the sort key of the last row of a page as an opaque cursor.
+
+    Args:
+        time (datetime): The lesson time of the last row.
+        row_id (int): The id of the last row.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    payload = json.dumps([time.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor (str): The cursor sent by the client.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+
+    Returns:
+        tuple[datetime, int]: The lesson time and row id to continue after.
+    """
+    try:
+        time, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(time), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor.") from e
+
+
+def filter_inspections(
+    query,
+    semester=None,
+    teacher_id=None,
+    subject_type=None,
+    date_from=None,
+    date_to=None,
+):
+    """
+    Apply the optional listing filters to an inspection query.
+
+    The query must already join ``Inspection``, ``Lesson`` and ``Subject``.
+
+    Args:
+        query (Query | Select): The inspection query to filter.
+        semester (str | None): Keep inspections of this schedule semester.
+        teacher_id (int | None): Keep lessons taught by this teacher.
+        subject_type (str | None): Keep subjects of this type.
+        date_from (datetime | None): Keep lessons at or after this time.
+        date_to (datetime | None): Keep lessons before this time.
+
+    Returns:
+        Query | Select: The filtered query.
+    """
+    if semester is not None:
+        query = query.join(
+            InspectionSchedule,
+            InspectionSchedule.id == Inspection.fk_inspectionSchedule,
+        ).filter(InspectionSchedule.year_semester == semester)
+    if teacher_id is not None:
+        query = query.filter(Lesson.fk_teacher == teacher_id)
+    if subject_type is not None:
+        query = query.filter(Subject.type == subject_type)
+    if date_from is not None:
+        query = query.filter(Lesson.time >= date_from)
+    if date_to is not None:
+        query = query.filter(Lesson.time < date_to)
+    return query
+
+
+def keyset_query(query, id_column, limit, cursor=None):
+    """
+    Build the query of one page of rows ordered by ``Lesson.time`` and an id column.
+
+    Instead of an OFFSET, the page starts right after the sort key encoded in
+    the cursor, so every page is a range scan no matter how deep it is. One
+    row more than the page size is selected, to tell whether a next page
+    exists; ``keyset_page`` turns the rows into the page.
+
+    Args:
+        query (Select): The column query to paginate, joining ``Lesson``.
+        id_column (Column): The unique column breaking ties on equal times.
+        limit (int): The page size.
+        cursor (str | None): The cursor returned with the previous page.
+
+    Returns:
+        Select: The query of the page, with the cursor columns added.
+    """
+    if cursor is not None:
+        time, row_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(Lesson.time > time, and_(Lesson.time == time, id_column > row_id))
+        )
+    return (
+        query.add_columns(
+            Lesson.time.label("cursor_time"), id_column.label("cursor_id")
+        )
+        .order_by(Lesson.time, id_column)
+        .limit(limit + 1)
+    )
+
+
+def keyset_page(rows, limit):
+    """
+    Cut the rows of a ``keyset_query`` down to one page.
+
+    Args:
+        rows (list[Row]): The rows of the query.
+        limit (int): The page size.
+
+    Returns:
+        tuple[list, str | None]: The rows of the page and the cursor of the
+            next page, or None when this is the last page.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].cursor_time, rows[-1].cursor_id)
@@ -0,0 +1,592 @@
+"""
+Batch planner assigning inspection teams to a semester's lessons.
+
+Matching lessons to teams by hand costs one availability lookup per lesson
+(``/inspection-teams/{teacher_id}/{lesson_id}/``). The planner loads what it
+needs in four queries (the candidate lessons, the team members, the current
+load of every team and the busy slots of the members during the planned
+period) and solves the whole batch in memory:
+
+1. Lessons starting at the same time share the set of teams whose members are
+   all free, computed once per start time from sorted per-teacher busy ranges.
+   Teams containing the inspected teacher, or more than one member of their
+   department, are then removed with set differences.
+2. Lessons are assigned most constrained first, each to the least loaded
+   feasible team that still has room and whose members the plan has not
+   already booked at an overlapping time.
+3. A lesson left without a team is repaired by moving one lesson off a feasible
+   team to another team that can take it.
+
+``apply_plan`` locks the planned teams, drops the assignments whose team was
+booked in the meantime and writes the others in the caller's transaction, and
+``plan_semester`` runs the whole plan for ``POST /inspection-schedule/plan/``
+and its background job.
+"""
+
+import bisect
+from collections import Counter, defaultdict
+
+from availability import (
+    LESSON_DURATION,
+    lesson_period,
+    lock_teams,
+    refresh_busy_slots,
+    team_members,
+)
+from models_sqlalchemy import (
+    Inspection,
+    InspectionSchedule,
+    Lesson,
+    Teacher,
+    TeacherBusySlot,
+    TeacherInspectionTeam,
+)
+from schedule_snapshot import refresh_schedule
+from sqlalchemy import and_, func, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+
+class BusyIndex:
+    """
+    Busy time ranges per teacher and overall, sorted by start for binary search.
+
+    Like ``availability.overlapping_slots``, the overlap tests rely on no range
+    lasting longer than ``LESSON_DURATION``. Ranges added in order of their start
+    are appended without moving the others.
+    """
+
+    def __init__(self):
+        self._ranges = defaultdict(list)
+        self._all = []
+
+    def add(self, teacher_id, starts_at, ends_at):
+        bisect.insort(self._ranges[teacher_id], (starts_at, ends_at))
+        bisect.insort(self._all, (starts_at, ends_at, teacher_id))
+
+    def remove(self, teacher_id, starts_at, ends_at):
+        ranges = self._ranges[teacher_id]
+        del ranges[bisect.bisect_left(ranges, (starts_at, ends_at))]
+        del self._all[bisect.bisect_left(self._all, (starts_at, ends_at, teacher_id))]
+
+    def is_free(self, teacher_id, starts_at, ends_at):
+        """Return whether no range of the teacher overlaps [starts_at, ends_at)."""
+        ranges = self._ranges.get(teacher_id)
+        if not ranges:
+            return True
+        position = bisect.bisect_left(ranges, (starts_at - LESSON_DURATION,))
+        while position < len(ranges) and ranges[position][0] < ends_at:
+            if ranges[position][1] > starts_at:
+                return False
+            position += 1
+        return True
+
+    def busy_teachers(self, starts_at, ends_at):
+        """Return the teachers with a range overlapping [starts_at, ends_at)."""
+        position = bisect.bisect_left(self._all, (starts_at - LESSON_DURATION,))
+        last = bisect.bisect_left(self._all, (ends_at,))
+        return {
+            teacher_id
+            for _, range_end, teacher_id in self._all[position:last]
+            if range_end > starts_at
+        }
+
+
+class PlanSolver:
+    """
+    Greedy assignment of lessons to teams with a one-move repair step.
+
+    Args:
+        teams (dict[int, list[tuple[int, str]]]): (teacher id, department) of
+            the members of every team.
+        busy (BusyIndex): The ranges during which teachers are already busy.
+        loads (dict[int, int]): The inspections every team already has.
+        capacity (int | None): The most inspections a team may have.
+    """
+
+    def __init__(self, teams, busy, loads, capacity=None):
+        self.members = {
+            team_id: [teacher_id for teacher_id, _ in members]
+            for team_id, members in teams.items()
+        }
+        self.busy = busy
+        self.loads = dict.fromkeys(teams, 0)
+        self.loads.update(loads)
+        self.capacity = capacity
+        self.booked = BusyIndex()
+        self.assignments = {}
+        self.team_lessons = defaultdict(set)
+
+        self.own_teams = defaultdict(set)
+        self.crowded_teams = defaultdict(set)
+        for team_id, members in teams.items():
+            for teacher_id, _ in members:
+                self.own_teams[teacher_id].add(team_id)
+            departments = Counter(department for _, department in members)
+            for department, count in departments.items():
+                if count > 1:
+                    self.crowded_teams[department].add(team_id)
+
+    def free_teams(self, starts_at, ends_at):
+        busy_teams = set().union(
+            *(
+                self.own_teams[teacher_id]
+                for teacher_id in self.busy.busy_teachers(starts_at, ends_at)
+                if teacher_id in self.own_teams
+            )
+        )
+        return self.members.keys() - busy_teams
+
+    def has_room(self, team_id):
+        return self.capacity is None or self.loads[team_id] < self.capacity
+
+    def is_unbooked(self, team_id, period):
+        return all(
+            self.booked.is_free(member, *period) for member in self.members[team_id]
+        )
+
+    def assign(self, lesson, team_id):
+        self.assignments[lesson.id] = team_id
+        self.team_lessons[team_id].add(lesson)
+        self.loads[team_id] += 1
+        for member in self.members[team_id]:
+            self.booked.add(member, *lesson.period)
+
+    def unassign(self, lesson):
+        team_id = self.assignments.pop(lesson.id)
+        self.team_lessons[team_id].discard(lesson)
+        self.loads[team_id] -= 1
+        for member in self.members[team_id]:
+            self.booked.remove(member, *lesson.period)
+        return team_id
+
+    def can_take(self, team_id, lesson):
+        return self.has_room(team_id) and self.is_unbooked(team_id, lesson.period)
+
+    def by_load(self, teams):
+        return sorted(teams, key=lambda team_id: (self.loads[team_id], team_id))
+
+    def pick(self, lesson, exclude=()):
+        """
+        Find the least loaded feasible team that can take a lesson.
+
+        Returns:
+            int | None: The team, or None.
+        """
+        candidates = lesson.feasible - set(exclude)
+        if not candidates:
+            return None
+        # The least loaded team usually fits; sort only when it does not.
+        best = min(candidates, key=self.loads.__getitem__)
+        if self.can_take(best, lesson):
+            return best
+        for team_id in self.by_load(candidates):
+            if self.can_take(team_id, lesson):
+                return team_id
+        return None
+
+    def blockers(self, lesson, team_id):
+        """
+        Find the planned lessons one of which must move for a team to take a lesson.
+
+        Returns:
+            list[PlannedLesson]: The lessons to try moving, empty when moving one
+                lesson cannot free the team.
+        """
+        teams = set().union(
+            *(self.own_teams[member] for member in self.members[team_id])
+        )
+        overlapping = [
+            other
+            for team in teams
+            for other in self.team_lessons[team]
+            if other.period[0] < lesson.period[1] and lesson.period[0] < other.period[1]
+        ]
+        if not overlapping:
+            return sorted(self.team_lessons[team_id], key=lambda other: other.id)
+        if len(overlapping) == 1 and (
+            self.has_room(team_id) or overlapping[0] in self.team_lessons[team_id]
+        ):
+            return overlapping
+        return []
+
+    def repair(self, lesson):
+        """
+        Assign a lesson by moving one planned lesson to another team.
+
+        Returns:
+            bool: Whether the lesson was assigned.
+        """
+        for team_id in self.by_load(lesson.feasible):
+            for blocker in self.blockers(lesson, team_id):
+                original = self.unassign(blocker)
+                if self.can_take(team_id, lesson):
+                    self.assign(lesson, team_id)
+                    target = self.pick(blocker, exclude={original})
+                    if target is not None:
+                        self.assign(blocker, target)
+                        return True
+                    self.unassign(lesson)
+                self.assign(blocker, original)
+        return False
+
+    def solve(self, lessons):
+        """
+        Assign teams to lessons.
+
+        Args:
+            lessons (list[PlannedLesson]): The lessons to assign.
+
+        Returns:
+            tuple[dict[int, int], dict[int, str]]: The team of every assigned
+                lesson, and the reason every other lesson was left unassigned.
+        """
+        free_by_period = {}
+        unassigned = {}
+        for lesson in lessons:
+            if lesson.period not in free_by_period:
+                free_by_period[lesson.period] = self.free_teams(*lesson.period)
+            lesson.feasible = (
+                free_by_period[lesson.period]
+                - self.own_teams[lesson.teacher_id]
+                - self.crowded_teams[lesson.department]
+            )
+            if not lesson.feasible:
+                unassigned[lesson.id] = "No team is free and eligible for this lesson."
+
+        for lesson in sorted(
+            (lesson for lesson in lessons if lesson.feasible),
+            key=lambda lesson: (len(lesson.feasible), lesson.period, lesson.id),
+        ):
+            team_id = self.pick(lesson)
+            if team_id is not None:
+                self.assign(lesson, team_id)
+            elif not self.repair(lesson):
+                unassigned[lesson.id] = (
+                    "Every eligible team is full or already booked at this time."
+                )
+
+        return dict(self.assignments), unassigned
+
+
+class PlannedLesson:
+    """
+    A candidate lesson of the planner.
+
+    Args:
+        lesson_id (int): The id of the lesson.
+        teacher_id (int): The inspected teacher.
+        department (str): The department of the inspected teacher.
+        time (datetime): The start of the lesson.
+    """
+
+    __slots__ = ("id", "teacher_id", "department", "period", "feasible")
+
+    def __init__(self, lesson_id, teacher_id, department, time):
+        self.id = lesson_id
+        self.teacher_id = teacher_id
+        self.department = department
+        self.period = lesson_period(time)
+        self.feasible = set()
+
+
+def load_lessons(db, schedule_id, semester, lesson_ids):
+    """
+    Load the candidate lessons, rejecting those that cannot be planned.
+
+    Returns:
+        tuple[list[PlannedLesson], list[dict]]: The lessons to plan, and one
+            result per rejected lesson id.
+    """
+    rows = db.execute(
+        select(
+            Lesson.id,
+            Lesson.time,
+            Lesson.fk_teacher,
+            Lesson.year_semester,
+            Teacher.department,
+            Inspection.id.label("inspection_id"),
+        )
+        .join(Teacher, Teacher.id == Lesson.fk_teacher)
+        .outerjoin(
+            Inspection,
+            and_(
+                Inspection.fk_lesson == Lesson.id,
+                Inspection.fk_inspectionSchedule == schedule_id,
+            ),
+        )
+        .where(Lesson.id.in_(lesson_ids))
+    ).all()
+
+    found = {row.id: row for row in rows}
+    lessons, rejected = [], []
+    for lesson_id in dict.fromkeys(lesson_ids):
+        row = found.get(lesson_id)
+        if row is None:
+            rejected.append(
+                {
+                    "fk_lesson": lesson_id,
+                    "status": "not_found",
+                    "detail": "Lesson not found.",
+                }
+            )
+        elif row.year_semester != semester:
+            rejected.append(
+                {
+                    "fk_lesson": lesson_id,
+                    "status": "conflict",
+                    "detail": "Lesson is not taught in this semester.",
+                }
+            )
+        elif row.inspection_id is not None:
+            rejected.append(
+                {
+                    "fk_lesson": lesson_id,
+                    "status": "conflict",
+                    "detail": "Lesson already has an inspection scheduled.",
+                }
+            )
+        else:
+            lessons.append(
+                PlannedLesson(row.id, row.fk_teacher, row.department, row.time)
+            )
+    return lessons, rejected
+
+
+def load_teams(db):
+    """
+    Load the members of every inspection team.
+
+    Returns:
+        dict[int, list[tuple[int, str]]]: (teacher id, department) per team.
+    """
+    teams = defaultdict(list)
+    for team_id, teacher_id, department in db.execute(
+        select(
+            TeacherInspectionTeam.fk_inspectionTeam,
+            Teacher.id,
+            Teacher.department,
+        )
+        .join(Teacher, Teacher.id == TeacherInspectionTeam.fk_teacher)
+        .order_by(TeacherInspectionTeam.id)
+    ):
+        teams[team_id].append((teacher_id, department))
+    return dict(teams)
+
+
+def load_busy(db, lessons):
+    """
+    Load the busy slots overlapping the period spanned by some lessons.
+
+    Returns:
+        BusyIndex: The busy ranges of every teacher during that period.
+    """
+    busy = BusyIndex()
+    if not lessons:
+        return busy
+    first = min(lesson.period[0] for lesson in lessons)
+    last = max(lesson.period[1] for lesson in lessons)
+    for teacher_id, starts_at, ends_at in db.execute(
+        select(
+            TeacherBusySlot.fk_teacher,
+            TeacherBusySlot.starts_at,
+            TeacherBusySlot.ends_at,
+        )
+        .where(
+            TeacherBusySlot.starts_at > first - LESSON_DURATION,
+            TeacherBusySlot.starts_at < last,
+        )
+        .order_by(TeacherBusySlot.starts_at)
+    ):
+        busy.add(teacher_id, starts_at, ends_at)
+    return busy
+
+
+def plan_inspections(db, schedule_id, semester, lesson_ids, capacity=None):
+    """
+    Plan a team for each of a semester's candidate lessons.
+
+    Nothing is written; see ``apply_plan``.
+
+    Args:
+        db (Session): The database session.
+        schedule_id (int): The inspection schedule the lessons are planned in.
+        semester (str): The semester of the schedule and lessons.
+        lesson_ids (list[int]): The candidate lessons.
+        capacity (int | None): The most inspections a team may have in the
+            schedule, counting those it already has.
+
+    Returns:
+        dict: ``assignments``, a list of ``fk_lesson``/``fk_inspectionTeam``
+            pairs in lesson order, and ``rejected``, one result per lesson that
+            could not be planned.
+    """
+    lessons, rejected = load_lessons(db, schedule_id, semester, lesson_ids)
+    loads = dict(
+        db.execute(
+            select(Inspection.fk_inspectionTeam, func.count())
+            .where(
+                Inspection.fk_inspectionSchedule == schedule_id,
+                Inspection.fk_inspectionTeam.is_not(None),
+            )
+            .group_by(Inspection.fk_inspectionTeam)
+        ).all()
+    )
+    solver = PlanSolver(load_teams(db), load_busy(db, lessons), loads, capacity)
+    assignments, unassigned = solver.solve(lessons)
+
+    rejected.extend(
+        {"fk_lesson": lesson_id, "status": "unassigned", "detail": detail}
+        for lesson_id, detail in unassigned.items()
+    )
+    return {
+        "assignments": [
+            {"fk_lesson": lesson.id, "fk_inspectionTeam": assignments[lesson.id]}
+            for lesson in lessons
+            if lesson.id in assignments
+        ],
+        "rejected": rejected,
+    }
+
+
+def booked_lessons(db, assignments):
+    """
+    Find the planned lessons during which a member of their team is now busy.
+
+    One query compares the busy slots of the team members with the teaching
+    slot of each lesson.
+
+    Args:
+        db (Session): The database session.
+        assignments (list[dict]): The assignments of ``plan_inspections``.
+
+    Returns:
+        set[int]: The ids of those lessons.
+    """
+    lesson = aliased(TeacherBusySlot)
+    return set(
+        db.scalars(
+            select(lesson.fk_lesson)
+            .join(
+                TeacherInspectionTeam,
+                tuple_(lesson.fk_lesson, TeacherInspectionTeam.fk_inspectionTeam).in_(
+                    [
+                        (assignment["fk_lesson"], assignment["fk_inspectionTeam"])
+                        for assignment in assignments
+                    ]
+                ),
+            )
+            .join(
+                TeacherBusySlot,
+                and_(
+                    TeacherBusySlot.fk_teacher == TeacherInspectionTeam.fk_teacher,
+                    TeacherBusySlot.starts_at < lesson.ends_at,
+                    TeacherBusySlot.ends_at > lesson.starts_at,
+                ),
+            )
+            .where(lesson.source == "teaching")
+            .distinct()
+        )
+    )
+
+
+def apply_plan(db, schedule_id, assignments):
+    """
+    Create the planned inspections in one multi-row insert.
+
+    The plan is read without locks, so the planned teams are locked first and
+    the lessons during which a member of their team has been booked since are
+    left out. The busy slots and schedule entries are rebuilt in the same
+    transaction; the session is not committed.
+
+    Args:
+        db (Session): The database session.
+        schedule_id (int): The inspection schedule.
+        assignments (list[dict]): The assignments of ``plan_inspections``.
+
+    Returns:
+        dict[int, int]: The id of the inspection created for every lesson that
+            was not left out.
+    """
+    if not assignments:
+        return {}
+    team_ids = {assignment["fk_inspectionTeam"] for assignment in assignments}
+    lock_teams(db, team_ids)
+    booked = booked_lessons(db, assignments)
+    rows = [
+        {"fk_inspectionSchedule": schedule_id, **assignment}
+        for assignment in assignments
+        if assignment["fk_lesson"] not in booked
+    ]
+    if not rows:
+        return {}
+    created = dict(
+        db.execute(
+            insert(Inspection).returning(Inspection.fk_lesson, Inspection.id), rows
+        ).all()
+    )
+    refresh_busy_slots(db, team_members({row["fk_inspectionTeam"] for row in rows}))
+    refresh_schedule(db, [row["fk_lesson"] for row in rows])
+    return created
+
+
+def plan_semester(db, semester, lesson_ids, capacity=None, dry_run=False):
+    """
+    Plan the inspections of a semester's lessons and, unless ``dry_run``, create them.
+
+    Args:
+        db (Session): The database session.
+        semester (str): The semester of the inspection schedule.
+        lesson_ids (list[int]): The candidate lessons.
+        capacity (int | None): The most inspections a team may have.
+        dry_run (bool): Whether to return the plan without creating it.
+
+    Raises:
+        LookupError: If the semester has no inspection schedule.
+        IntegrityError: If the inspections cannot be created; the session is
+            rolled back.
+
+    Returns:
+        dict: The number of planned and rejected lessons, the assignments, with
+            the ID of the created inspection unless ``dry_run`` is set, and the
+            reason every other lesson was rejected.
+    """
+    schedule_id = db.scalar(
+        select(InspectionSchedule.id)
+        .where(InspectionSchedule.year_semester == semester)
+        .order_by(InspectionSchedule.id)
+        .limit(1)
+    )
+    if schedule_id is None:
+        raise LookupError("No inspection schedule found.")
+
+    plan = plan_inspections(db, schedule_id, semester, lesson_ids, capacity)
+    assignments = plan["assignments"]
+    if assignments and not dry_run:
+        try:
+            created_ids = apply_plan(db, schedule_id, assignments)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise
+        plan["rejected"].extend(
+            {
+                "fk_lesson": assignment["fk_lesson"],
+                "status": "conflict",
+                "detail": "A team member was booked during the lesson while planning.",
+            }
+            for assignment in assignments
+            if assignment["fk_lesson"] not in created_ids
+        )
+        assignments = [
+            {**assignment, "id": created_ids[assignment["fk_lesson"]]}
+            for assignment in assignments
+            if assignment["fk_lesson"] in created_ids
+        ]
+
+    return {
+        "planned": len(assignments),
+        "rejected": len(plan["rejected"]),
+        "assignments": assignments,
+        "rejected_lessons": plan["rejected"],
+    }
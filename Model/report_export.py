@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from models_sqlalchemy import (
+    Inspection,
+    InspectionReport,
+    Lesson,
+    Subject,
+    Teacher,
+)
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    InspectionReport.id.label("report_id"),
+    Inspection.id.label("inspection_id"),
+    Inspection.fk_inspectionTeam.label("team_id"),
+    InspectionReport.name.label("report_name"),
+    InspectionReport.lateness_minutes,
+    InspectionReport.students_attendance,
+    InspectionReport.room_adaptation,
+    InspectionReport.content_compatibility,
+    InspectionReport.substantive_rating,
+    InspectionReport.final_rating,
+    InspectionReport.objection,
+    Lesson.id.label("lesson_id"),
+    Lesson.time.label("lesson_time"),
+    Lesson.room,
+    Lesson.building,
+    Subject.name.label("subject_name"),
+    Subject.code.label("subject_code"),
+    Subject.type.label("subject_type"),
+    Teacher.id.label("teacher_id"),
+    Teacher.title.label("teacher_title"),
+    Teacher.name.label("teacher_name"),
+    Teacher.surname.label("teacher_surname"),
+    Teacher.department.label("teacher_department"),
+]
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+
+def export_query(db):
+    """
+    Build the query listing every inspection report with its lesson, subject
+    and teacher.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        Query: A flat column query, one row per report.
+    """
+    return (
+        db.query(*EXPORT_COLUMNS)
+        .join(Inspection, Inspection.fk_inspectionReport == InspectionReport.id)
+        .join(Lesson, Inspection.fk_lesson == Lesson.id)
+        .join(Subject, Lesson.fk_subject == Subject.id)
+        .join(Teacher, Lesson.fk_teacher == Teacher.id)
+    )
+
+
+def stream_rows(query):
+    """
+    Iterate over a query through a server-side cursor.
+
+    Rows are fetched ``EXPORT_BATCH_SIZE`` at a time, so only one batch is held
+    in memory and the first rows are available before the query has finished.
+
+    Args:
+        query (Query): The query to stream.
+
+    Yields:
+        Row: The query rows.
+    """
+    yield from query.order_by(InspectionReport.id).yield_per(EXPORT_BATCH_SIZE)
+
+
+def ndjson_lines(query):
+    """
+    Serialize a query as newline-delimited JSON, one object per row.
+
+    Args:
+        query (Query): A query built by ``export_query``.
+
+    Yields:
+        str: One JSON document per line.
+    """
+    for row in stream_rows(query):
+        yield json.dumps(dict(row._mapping), default=datetime.isoformat) + "\n"
+
+
+def csv_lines(query):
+    """
+    Serialize a query as CSV with a header row.
+
+    Args:
+        query (Query): A query built by ``export_query``.
+
+    Yields:
+        str: The header line followed by one line per row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in stream_rows(query):
+        writer.writerow(row)
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,242 @@
+"""
+Per-request timing and SQL statement instrumentation.
+
+``RequestMetricsMiddleware`` measures the wall time of every request and,
+through SQLAlchemy's ``before_cursor_execute``/``after_cursor_execute`` events
+(registered for every engine), the statements it executes: how many, the time
+spent in the database and the rows they report. The numbers are
+
+- sent back in a ``Server-Timing`` header, e.g.
+  ``app;dur=12.4, db;dur=3.1;desc="4 statements, 40 rows"``,
+- added up per endpoint and exported by ``/metrics``,
+- logged with the slowest statements of the request when it takes longer than
+  ``SLOW_REQUEST_MS`` milliseconds (default 0, disabled), on the
+  ``inspections.slow_requests`` logger.
+
+Rows are the drivers' ``rowcount``: PostgreSQL drivers report it for queries
+too, SQLite only for INSERT, UPDATE and DELETE. Statements run while a
+streaming response is being sent, after its headers, are not counted.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOWEST_STATEMENTS_LOGGED = 5
+
+slow_request_log = logging.getLogger("inspections.slow_requests")
+current_request = ContextVar("current_request", default=None)
+
+
+class RequestStats:
+    """
+    What one request has done so far.
+
+    Args:
+        keep_statements (bool): Whether to keep the SQL of every statement,
+            needed to log slow requests.
+    """
+
+    def __init__(self, keep_statements=False):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.keep_statements = keep_statements
+        self.timed_statements = []
+
+    def record(self, statement, seconds, rows):
+        self.statements += 1
+        self.db_seconds += seconds
+        if rows > 0:
+            self.rows += rows
+        if self.keep_statements:
+            self.timed_statements.append((seconds, statement))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """
+        Format the statistics as a ``Server-Timing`` header value.
+
+        Returns:
+            str: The header value, durations in milliseconds.
+        """
+        statements = "statement" if self.statements == 1 else "statements"
+        return (
+            f"app;dur={self.elapsed() * 1000:.1f}, "
+            f"db;dur={self.db_seconds * 1000:.1f};"
+            f'desc="{self.statements} {statements}, {self.rows} rows"'
+        )
+
+
+# The start time is kept on the execution context of the statement, which is
+# dropped with it when the statement fails, unlike the pooled connection.
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request.get() is not None and context is not None:
+        context.request_metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    started = getattr(context, "request_metrics_started", None)
+    if stats is None or started is None:
+        return
+    stats.record(statement, time.perf_counter() - started, cursor.rowcount)
+
+
+class RequestMetrics:
+    """
+    Request and SQL statement counters, added up per endpoint.
+
+    Args:
+        slow_request_ms (float): Requests taking at least this long are logged
+            with their slowest statements; 0 disables the log.
+    """
+
+    def __init__(self, slow_request_ms=0):
+        self.slow_request_ms = slow_request_ms
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start recording a request.
+
+        Returns:
+            RequestStats: The statistics the SQL events of the request go to.
+        """
+        return RequestStats(keep_statements=self.slow_request_ms > 0)
+
+    def finish(self, endpoint, stats, method="GET", path=""):
+        """
+        Add a finished request to the totals and log it when it was slow.
+
+        Args:
+            endpoint (str): The name the request is reported under.
+            stats (RequestStats): The statistics of the request.
+            method (str): The HTTP method, for the slow request log.
+            path (str): The URL path, for the slow request log.
+        """
+        seconds = stats.elapsed()
+        with self._lock:
+            totals = self._totals.setdefault(
+                endpoint,
+                {
+                    "http_requests_total": 0,
+                    "http_request_seconds_total": 0.0,
+                    "http_request_seconds_max": 0.0,
+                    "db_statements_total": 0,
+                    "db_seconds_total": 0.0,
+                    "db_rows_total": 0,
+                },
+            )
+            totals["http_requests_total"] += 1
+            totals["http_request_seconds_total"] += seconds
+            totals["http_request_seconds_max"] = max(
+                totals["http_request_seconds_max"], seconds
+            )
+            totals["db_statements_total"] += stats.statements
+            totals["db_seconds_total"] += stats.db_seconds
+            totals["db_rows_total"] += stats.rows
+
+        if self.slow_request_ms and seconds * 1000 >= self.slow_request_ms:
+            slowest = sorted(stats.timed_statements, key=lambda item: -item[0])
+            slow_request_log.warning(
+                "%s %s took %.1f ms, %d statements in %.1f ms%s",
+                method,
+                path,
+                seconds * 1000,
+                stats.statements,
+                stats.db_seconds * 1000,
+                "".join(
+                    f"\n  {statement_seconds * 1000:.1f} ms: {statement}"
+                    for statement_seconds, statement in slowest[
+                        :SLOWEST_STATEMENTS_LOGGED
+                    ]
+                ),
+            )
+
+    def clear(self):
+        """Drop every counter."""
+        with self._lock:
+            self._totals.clear()
+
+    def metrics(self):
+        """
+        Snapshot the counters.
+
+        Returns:
+            dict[tuple[str, str], float]: Values keyed by (metric, endpoint name).
+        """
+        with self._lock:
+            return {
+                (metric, endpoint): round(value, 6)
+                for endpoint, totals in self._totals.items()
+                for metric, value in totals.items()
+            }
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording every HTTP request in a ``RequestMetrics``.
+
+    Requests are reported under the name of the endpoint function that handled
+    them, or ``unmatched`` when no route matched.
+
+    Args:
+        app: The ASGI application to wrap.
+        metrics (RequestMetrics): Where requests are added up.
+    """
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = self.metrics.start()
+        token = current_request.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            endpoint = scope.get("endpoint")
+            self.metrics.finish(
+                getattr(endpoint, "__name__", "unmatched"),
+                stats,
+                scope["method"],
+                scope["path"],
+            )
+
+
+def create_request_metrics(environ=os.environ):
+    """
+    Create the request metrics configured by the environment.
+
+    Args:
+        environ (Mapping[str, str]): The environment to read.
+
+    Returns:
+        RequestMetrics: The configured metrics.
+    """
+    return RequestMetrics(float(environ.get("SLOW_REQUEST_MS", 0)))
@@ -0,0 +1,152 @@
+"""
+Denormalized per-semester inspection schedule.
+
+``/schedule/`` would otherwise join inspections, schedules, lessons, subjects,
+teachers and team members for every viewer, although the published schedule
+changes rarely. Each inspection is stored as one ``ScheduleEntry`` row holding
+everything the schedule shows, so a semester is read with a single scan of the
+(year_semester, lesson_time) index.
+
+Write endpoints call ``refresh_schedule`` for the lessons they affect, in the
+same transaction; rows keep the time they were built at in ``refreshed_at``.
+"""
+
+from datetime import datetime, timezone
+
+from derived_tables import refresh, replace_rows
+from models_sqlalchemy import (
+    Inspection,
+    InspectionSchedule,
+    Lesson,
+    ScheduleEntry,
+    Subject,
+    Teacher,
+    TeacherInspectionTeam,
+)
+from sqlalchemy import Select, delete, select
+
+
+def team_lessons(team_ids):
+    """
+    Build a query selecting the lessons inspected by some inspection teams.
+
+    Args:
+        team_ids (Iterable[int]): The ids of the teams.
+
+    Returns:
+        Select: A query of lesson ids, usable as ``refresh_schedule`` lessons.
+    """
+    return select(Inspection.fk_lesson).where(
+        Inspection.fk_inspectionTeam.in_(team_ids)
+    )
+
+
+@refresh
+def refresh_schedule(db, lessons=None):
+    """
+    Rebuild the schedule entries of some or all lessons.
+
+    Args:
+        db (Session): The database session.
+        lessons (Iterable[int] | Select | None): The lessons whose entries are
+            rebuilt, or None for every lesson.
+
+    Returns:
+        int: The number of entries written.
+    """
+    inspections = (
+        select(
+            InspectionSchedule.year_semester,
+            Inspection.id.label("inspection_id"),
+            Inspection.fk_inspectionTeam.label("team_id"),
+            Lesson.id.label("lesson_id"),
+            Lesson.time,
+            Lesson.room,
+            Lesson.building,
+            Subject.name.label("subject_name"),
+            Subject.type.label("subject_type"),
+            Teacher.title.label("teacher_title"),
+            Teacher.name.label("teacher_name"),
+            Teacher.surname.label("teacher_surname"),
+        )
+        .join(
+            InspectionSchedule,
+            InspectionSchedule.id == Inspection.fk_inspectionSchedule,
+        )
+        .join(Lesson, Lesson.id == Inspection.fk_lesson)
+        .join(Subject, Subject.id == Lesson.fk_subject)
+        .join(Teacher, Teacher.id == Lesson.fk_teacher)
+    )
+    stale = delete(ScheduleEntry)
+    if lessons is not None:
+        if not isinstance(lessons, Select):
+            lessons = list(lessons)
+        inspections = inspections.where(Lesson.id.in_(lessons))
+        stale = stale.where(ScheduleEntry.fk_lesson.in_(lessons))
+    rows = db.execute(inspections).all()
+
+    teachers_by_team = {}
+    team_ids = {row.team_id for row in rows if row.team_id is not None}
+    if team_ids:
+        members = db.execute(
+            select(
+                TeacherInspectionTeam.fk_inspectionTeam,
+                Teacher.title,
+                Teacher.name,
+                Teacher.surname,
+            )
+            .join(Teacher, Teacher.id == TeacherInspectionTeam.fk_teacher)
+            .where(TeacherInspectionTeam.fk_inspectionTeam.in_(team_ids))
+            .order_by(TeacherInspectionTeam.id)
+        )
+        for team_id, title, name, surname in members:
+            teachers_by_team.setdefault(team_id, []).append(
+                {"title": title, "name": name, "surname": surname}
+            )
+
+    refreshed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    entries = [
+        {
+            "year_semester": row.year_semester,
+            "fk_inspection": row.inspection_id,
+            "fk_lesson": row.lesson_id,
+            "fk_inspectionTeam": row.team_id,
+            "lesson_time": row.time,
+            "room": row.room,
+            "building": row.building,
+            "subject_name": row.subject_name,
+            "subject_type": row.subject_type,
+            "teacher_title": row.teacher_title,
+            "teacher_name": row.teacher_name,
+            "teacher_surname": row.teacher_surname,
+            "inspection_team": teachers_by_team.get(row.team_id, []),
+            "refreshed_at": refreshed_at,
+        }
+        for row in rows
+    ]
+
+    return replace_rows(db, ScheduleEntry, stale, entries)
+
+
+def schedule_query(semester):
+    """
+    Build the query of the schedule entries of a semester in lesson order.
+
+    Entries of the same lesson come in inspection order, so every backend
+    lists the same one first.
+
+    Args:
+        semester (str): The inspection schedule semester.
+
+    Returns:
+        Select: The ``ScheduleEntry`` rows, one per inspection.
+    """
+    return (
+        select(ScheduleEntry)
+        .where(ScheduleEntry.year_semester == semester)
+        .order_by(
+            ScheduleEntry.lesson_time,
+            ScheduleEntry.fk_lesson,
+            ScheduleEntry.fk_inspection,
+        )
+    )
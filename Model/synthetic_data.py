@@ -0,0 +1,278 @@
+"""
+Synthetic university data for benchmarks and database-backed tests.
+
+The generated rows follow the shapes used in InsertData.sql (departments,
+titles, buildings, subject types and semesters) so that every endpoint can be
+exercised against a realistic, arbitrarily large data set without PostgreSQL.
+"""
+
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from analytics import refresh_rollups
+from availability import refresh_busy_slots
+from models_sqlalchemy import (
+    Administrator,
+    Base,
+    Inspection,
+    InspectionReport,
+    InspectionSchedule,
+    InspectionTeam,
+    Lesson,
+    Subject,
+    Teacher,
+    TeacherInspectionTeam,
+)
+from schedule_snapshot import refresh_schedule
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.pool import StaticPool
+
+TITLES = [
+    "mgr",
+    "mgr inż",
+    "dr",
+    "dr inż",
+    "dr hab",
+    "profesor dr hab inż",
+    "profesor",
+]
+DEPARTMENTS = [
+    "Department of Automation",
+    "Mechatronics and Control Systems (K28)",
+    "Department of Computer Science and Systems Engineering (K44)",
+    "Department of Applied Informatics (K45)",
+    "Department of Technical Computer Science (K30)",
+    "Department of Computer Science Principles (K68)",
+    "Department of Artificial Intelligence (K46)",
+    "Department of Computer Systems and Networks (K32)",
+    "Department of Telecomunication and Informatics (K34)",
+]
+BUILDINGS = ["A1", "B4", "C4", "C6", "C13", "C16", "D1", "D2"]
+SUBJECT_TYPES = ["Lecture", "Laboratory", "Project", "Seminar", "Practical"]
+SEMESTER_STARTS = {
+    "Winter 2024": datetime(2024, 10, 1),
+    "Summer 2024": datetime(2024, 2, 19),
+    "Winter 2023": datetime(2023, 10, 2),
+    "Summer 2023": datetime(2023, 2, 20),
+}
+LESSON_HOURS = [8, 10, 12, 14, 16, 18]
+SEMESTER_WEEKS = 15
+TEAM_SIZE = 3
+
+
+def create_sqlite_engine(url="sqlite://"):
+    """
+    Create a SQLite engine with the full schema created.
+
+    The default in-memory database is shared by every session of the engine,
+    so it can back the FastAPI app through a dependency override.
+
+    Args:
+        url (str): The SQLite database URL.
+
+    Returns:
+        Engine: An engine with all tables created.
+    """
+    engine = create_engine(
+        url, connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def lesson_slots(semester, weeks=SEMESTER_WEEKS):
+    """
+    List every weekday lesson slot of a semester.
+
+    Args:
+        semester (str): A semester name from ``SEMESTER_STARTS``.
+        weeks (int): The number of teaching weeks.
+
+    Returns:
+        list[datetime]: The start times of the lessons.
+    """
+    start = SEMESTER_STARTS[semester]
+    return [
+        start + timedelta(days=day, hours=hour)
+        for day in range(weeks * 7)
+        if (start + timedelta(days=day)).weekday() < 5
+        for hour in LESSON_HOURS
+    ]
+
+
+def seed_university(
+    db,
+    teachers=1000,
+    teams=200,
+    subjects=100,
+    lessons_per_teacher=20,
+    inspections=2000,
+    semester="Winter 2024",
+    seed=0,
+):
+    """
+    Fill an empty database with a synthetic university.
+
+    Every team gets up to ``TEAM_SIZE`` distinct members and every inspection
+    gets a report, so all read endpoints return data.
+
+    Args:
+        db (Session): The database session to insert into.
+        teachers (int): Number of teachers.
+        teams (int): Number of inspection teams.
+        subjects (int): Number of subjects.
+        lessons_per_teacher (int): Number of lessons taught by each teacher.
+        inspections (int): Number of inspected lessons.
+        semester (str): The semester the lessons and inspections belong to.
+        seed (int): Random seed, so runs are reproducible.
+
+    Returns:
+        dict: The number of rows inserted per table.
+    """
+    rng = random.Random(seed)
+    slots = lesson_slots(semester)
+
+    db.execute(
+        insert(Teacher),
+        [
+            {
+                "id": i,
+                "title": rng.choice(TITLES),
+                "department": rng.choice(DEPARTMENTS),
+                "login": f"tlogin{i}",
+                "name": f"Name{i}",
+                "surname": f"Surname{i}",
+                "password_hash": f"hash{i}",
+            }
+            for i in range(1, teachers + 1)
+        ],
+    )
+    db.execute(
+        insert(Subject),
+        [
+            {
+                "id": i,
+                "name": f"Subject {i}",
+                "type": rng.choice(SUBJECT_TYPES),
+                "code": f"SUB{i:04d}",
+            }
+            for i in range(1, subjects + 1)
+        ],
+    )
+    db.execute(
+        insert(InspectionTeam),
+        [{"id": i, "name": f"Team {i}"} for i in range(1, teams + 1)],
+    )
+    memberships = [
+        {"fk_teacher": teacher_id, "fk_inspectionTeam": team_id}
+        for team_id in range(1, teams + 1)
+        for teacher_id in rng.sample(range(1, teachers + 1), min(TEAM_SIZE, teachers))
+    ]
+    db.execute(insert(TeacherInspectionTeam), memberships)
+
+    lessons = []
+    for teacher_id in range(1, teachers + 1):
+        for time in rng.sample(slots, min(lessons_per_teacher, len(slots))):
+            lessons.append(
+                {
+                    "id": len(lessons) + 1,
+                    "time": time,
+                    "year_semester": semester,
+                    "room": f"Room {rng.randint(1, 40) * 10 + 1}",
+                    "building": rng.choice(BUILDINGS),
+                    "fk_subject": rng.randint(1, subjects),
+                    "fk_teacher": teacher_id,
+                }
+            )
+    if lessons:
+        db.execute(insert(Lesson), lessons)
+
+    db.execute(
+        insert(Administrator),
+        [
+            {
+                "id": 1,
+                "first_name": "John",
+                "last_name": "Doe",
+                "email": "admin@example.com",
+                "password": "hashedpassword123",
+            }
+        ],
+    )
+    db.execute(
+        insert(InspectionSchedule),
+        [{"id": 1, "year_semester": semester, "fk_administrator": 1}],
+    )
+
+    inspected = rng.sample(lessons, min(inspections, len(lessons)))
+    if inspected:
+        db.execute(
+            insert(InspectionReport),
+            [
+                {
+                    "id": i,
+                    "name": f"Report {i}",
+                    "lateness_minutes": rng.choice([0, 0, 5, 10, 15]),
+                    "students_attendance": rng.randint(5, 60),
+                    "room_adaptation": rng.choice(["Adapted", "Not Adapted"]),
+                    "content_compatibility": rng.randint(1, 5),
+                    "substantive_rating": rng.choice(["Poor", "Good", "Excellent"]),
+                    "final_rating": rng.randint(2, 5),
+                    "objection": "No objections",
+                }
+                for i in range(1, len(inspected) + 1)
+            ],
+        )
+        db.execute(
+            insert(Inspection),
+            [
+                {
+                    "id": i,
+                    "fk_inspectionSchedule": 1,
+                    "fk_inspectionTeam": rng.randint(1, teams) if teams else None,
+                    "fk_inspectionReport": i,
+                    "fk_lesson": lesson["id"],
+                }
+                for i, lesson in enumerate(inspected, start=1)
+            ],
+        )
+    busy_slots = refresh_busy_slots(db)
+    schedule_entries = refresh_schedule(db)
+    rollups = refresh_rollups(db)
+    db.commit()
+
+    return {
+        "teachers": teachers,
+        "subjects": subjects,
+        "teams": teams,
+        "memberships": len(memberships),
+        "lessons": len(lessons),
+        "inspections": len(inspected),
+        "busy_slots": busy_slots,
+        "schedule_entries": schedule_entries,
+        "rollups": rollups,
+    }
+
+
+@contextmanager
+def count_statements(engine):
+    """
+    Count the SQL statements an engine executes inside a ``with`` block.
+
+    Args:
+        engine (Engine): The engine to observe.
+
+    Yields:
+        list[str]: The executed statements, filled in as they run.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,139 @@
+import time
+
+import pytest
+
+from cache import MISSING, MemoryBackend, ResponseCache, create_cache
+from model_database_API import reference_cache
+from synthetic_data import count_statements
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    backend.get("a")
+    backend.set("c", 3, ttl=60)
+
+    assert backend.get("a") == 1
+    assert backend.get("b") is MISSING
+    assert backend.get("c") == 3
+
+
+def test_memory_backend_expires_entries():
+    backend = MemoryBackend()
+    backend.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+
+    assert backend.get("a") is MISSING
+
+
+def test_invalidate_bumps_tag_version():
+    cache = ResponseCache(MemoryBackend())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute("teams", ("teams",), "", compute) == 1
+    assert cache.get_or_compute("teams", ("teams",), "", compute) == 1
+    cache.invalidate("teams")
+    assert cache.get_or_compute("teams", ("teams",), "", compute) == 2
+    assert cache.metrics() == {
+        ("cache_hits_total", "teams"): 1,
+        ("cache_misses_total", "teams"): 2,
+    }
+
+
+def test_teachers_are_served_from_cache(engine, client):
+    first = client.get("/teachers/").json()
+    with count_statements(engine) as statements:
+        second = client.get("/teachers/").json()
+
+    assert first == second
+    assert statements == []
+    assert reference_cache.metrics()[("cache_hits_total", "get_teachers")] == 1
+
+
+def test_team_changes_invalidate_cached_teams(client):
+    before = client.get("/inspection-teams/", params={"expand": "members"}).json()
+    removed = before[0]["teachers"][0]["id"]
+
+    response = client.request(
+        "DELETE",
+        f"/inspection-teams/{before[0]['id']}/remove-teacher/",
+        json={"teacher_id": removed},
+    )
+    after = client.get("/inspection-teams/", params={"expand": "members"}).json()
+
+    assert response.status_code == 200
+    assert removed not in [teacher["id"] for teacher in after[0]["teachers"]]
+    assert len(after[0]["teachers"]) == len(before[0]["teachers"]) - 1
+
+
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        ("/inspection-terms/", {}),
+        ("/inspection-docs/", {"limit": 5}),
+        ("/schedule/", {"semester": "Winter 2024"}),
+    ],
+)
+def test_conditional_get_returns_304_without_queries(engine, client, path, params):
+    first = client.get(path, params=params)
+    etag = first.headers["etag"]
+
+    with count_statements(engine) as statements:
+        second = client.get(path, params=params, headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert statements == []
+
+
+def test_conditional_get_is_off_for_in_process_caches_of_several_workers(
+    client, monkeypatch
+):
+    assert create_cache({}).conditional
+    assert not create_cache({"WEB_CONCURRENCY": "4"}).conditional
+
+    monkeypatch.setattr(reference_cache, "conditional", False)
+    response = client.get("/inspection-docs/", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+
+
+def test_etags_expire_with_the_ttl(client, monkeypatch):
+    monkeypatch.setattr(reference_cache, "ttl", 0.01)
+    etag = client.get("/inspection-docs/").headers["etag"]
+    time.sleep(0.02)
+
+    response = client.get("/inspection-docs/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_etag_changes_after_report_edit(client):
+    etag = client.get("/inspection-docs/").headers["etag"]
+    report = {
+        "lateness_minutes": 3,
+        "students_attendance": 12,
+        "room_adaptation": "Adapted",
+        "content_compatibility": 4,
+        "substantive_rating": "Good",
+        "final_rating": 4,
+        "objection": "No objections",
+    }
+
+    client.post("/inspection-docs/1/edit/", json=report, headers={"If-Match": "*"})
+    response = client.get("/inspection-docs/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert client.get("/inspection-docs/", params={"limit": 1}).headers["etag"] != (
+        response.headers["etag"]
+    )
@@ -4,7 +4,6 @@ import pytest
 from fastapi.testclient import TestClient
 
 from model_database_API import app, get_db
-from models_sqlalchemy import InspectionTeam
 
 
 @pytest.fixture
@@ -12,7 +11,7 @@ def mock_db_session():
 
     mock_session = MagicMock()
 
-    mock_session.query.return_value.distinct.return_value.all.return_value = [
+    mock_session.execute.return_value.all.return_value = [
         ("2023-Fall",),
         ("2024-Spring",),
     ]
@@ -25,7 +24,10 @@ def mock_db_session():
     mock_team_2.id = 2
     mock_team_2.name = "Team B"
 
-    mock_session.query(InspectionTeam).all.return_value = [mock_team_1, mock_team_2]
+    mock_session.execute.return_value.scalars.return_value.all.return_value = [
+        mock_team_1,
+        mock_team_2,
+    ]
 
     yield mock_session
 
@@ -40,7 +42,7 @@ def test_get_available_semesters_with_data(mock_db_session):
 
 
 def test_get_available_semesters_empty(mock_db_session):
-    mock_db_session.query.return_value.distinct.return_value.all.return_value = []
+    mock_db_session.execute.return_value.all.return_value = []
     app.dependency_overrides[get_db] = lambda: mock_db_session
     client = TestClient(app)
 
@@ -61,7 +63,7 @@ def test_get_inspection_teams_with_data(mock_db_session):
 
 
 def test_get_inspection_teams_empty(mock_db_session):
-    mock_db_session.query(InspectionTeam).all.return_value = []
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = []
     app.dependency_overrides[get_db] = lambda: mock_db_session
     client = TestClient(app)
 
@@ -0,0 +1,171 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.orm import sessionmaker
+
+from availability import busy_teachers_query, busy_teams_query, lesson_period
+from migrate import migration_files
+from model_database_API import app, get_db
+from models_sqlalchemy import (
+    Base,
+    Inspection,
+    InspectionSchedule,
+    Lesson,
+    ScheduleEntry,
+    TeacherInspectionTeam,
+)
+from synthetic_data import create_sqlite_engine, lesson_slots, seed_university
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_sqlite_engine()
+    with sessionmaker(bind=engine)() as db:
+        counts = seed_university(
+            db,
+            teachers=5000,
+            teams=500,
+            subjects=200,
+            lessons_per_teacher=20,
+            inspections=5000,
+        )
+        db.execute(text("ANALYZE"))
+        db.commit()
+    assert counts["lessons"] == 100_000
+    yield engine
+    engine.dispose()
+
+
+def query_plan(engine, statement):
+    sql = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+        return "\n".join(row.detail for row in rows)
+
+
+def test_models_declare_every_migration_index():
+    declared = {
+        index.name for table in Base.metadata.tables.values() for index in table.indexes
+    }
+    migrated = set()
+    for _, _, path in migration_files():
+        with open(path, encoding="utf-8") as file:
+            script = file.read()
+        migrated.update(re.findall(r'CREATE (?:UNIQUE )?INDEX[^"]*"(\w+)"', script))
+        migrated.difference_update(re.findall(r'DROP INDEX[^"]*"(\w+)"', script))
+
+    assert migrated
+    assert migrated <= declared
+
+
+@pytest.mark.parametrize(
+    "statement, index",
+    [
+        (
+            lambda time: busy_teachers_query(*lesson_period(time)),
+            "teacherbusyslot_starts_at_index",
+        ),
+        (
+            lambda time: busy_teams_query(*lesson_period(time)),
+            "teacherbusyslot_starts_at_index",
+        ),
+        (
+            lambda time: select(Lesson.id).where(Lesson.time == time),
+            "lesson_time_index",
+        ),
+        (
+            lambda time: select(Inspection.id).where(Inspection.fk_lesson == 5),
+            "inspection_fk_lesson_index",
+        ),
+        (
+            lambda time: select(Lesson.id).where(Lesson.fk_teacher == 42),
+            "lesson_fk_teacher_time_index",
+        ),
+        (
+            lambda time: select(Lesson.id)
+            .where(Lesson.fk_teacher == 42, Lesson.time >= time)
+            .order_by(Lesson.time),
+            "lesson_fk_teacher_time_index",
+        ),
+        (
+            lambda time: select(Lesson.id).where(Lesson.fk_subject == 7),
+            "lesson_fk_subject_index",
+        ),
+        (
+            lambda time: select(Inspection.id).where(Inspection.fk_inspectionTeam == 3),
+            "inspection_fk_inspectionteam_index",
+        ),
+        (
+            lambda time: select(Inspection.id)
+            .join(
+                InspectionSchedule,
+                Inspection.fk_inspectionSchedule == InspectionSchedule.id,
+            )
+            .where(InspectionSchedule.year_semester == "Winter 2024"),
+            "inspection_fk_inspectionschedule_index",
+        ),
+        (
+            lambda time: select(TeacherInspectionTeam.id).where(
+                TeacherInspectionTeam.fk_inspectionTeam == 3,
+                TeacherInspectionTeam.fk_teacher == 42,
+            ),
+            "teacherinspectionteam_team_teacher_unique",
+        ),
+        (
+            lambda time: select(Lesson.id)
+            .where(Lesson.year_semester == "Winter 2024")
+            .order_by(Lesson.time, Lesson.id),
+            "lesson_year_semester_time_index",
+        ),
+        (
+            lambda time: select(ScheduleEntry)
+            .where(ScheduleEntry.year_semester == "Winter 2024")
+            .order_by(
+                ScheduleEntry.lesson_time,
+                ScheduleEntry.fk_lesson,
+                ScheduleEntry.fk_inspection,
+            ),
+            "scheduleentry_semester_time_lesson_inspection_index",
+        ),
+    ],
+)
+def test_hot_queries_use_indexes(engine, statement, index):
+    plan = query_plan(engine, statement(lesson_slots("Winter 2024")[0]))
+
+    assert f"INDEX {index}" in plan
+    assert not re.search(r"^SCAN \w+$", plan, re.MULTILINE)
+    assert "TEMP B-TREE" not in plan
+
+
+def test_adding_a_teacher_twice_is_rejected_by_the_unique_index():
+    engine = create_sqlite_engine()
+    with sessionmaker(bind=engine)() as db:
+        seed_university(db, teachers=10, teams=2, subjects=2, inspections=0)
+        member, other = db.scalars(
+            select(TeacherInspectionTeam).where(
+                TeacherInspectionTeam.fk_inspectionTeam == 1
+            )
+        ).all()[:2]
+        # Leave room in the team so only the duplicate is wrong.
+        db.delete(other)
+        db.commit()
+        member = member.fk_teacher
+    session_factory = sessionmaker(bind=engine)
+
+    def override_get_db():
+        with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        response = TestClient(app).post(
+            "/inspection-teams/1/add-teacher/", json={"teacher_id": member}
+        )
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        engine.dispose()
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Teacher is already in the team"
@@ -0,0 +1,176 @@
+import os
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+import model_database_API
+from database import DatabaseSettings
+from jobs import Job, JobQueue
+from models_sqlalchemy import Inspection, InspectionRollup
+from planner import plan_semester
+from synthetic_data import create_sqlite_engine, seed_university
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Worker processes open the database by URL, so it cannot be in memory.
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    with sessionmaker(bind=engine)() as db:
+        seed_university(db, teachers=40, teams=10, subjects=5, inspections=20)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def invalidated():
+    return []
+
+
+@pytest.fixture
+def queue(engine, invalidated):
+    queue = JobQueue(
+        DatabaseSettings(url=str(engine.url)),
+        max_workers=1,
+        on_success=invalidated.extend,
+    )
+    yield queue
+    queue.shutdown()
+
+
+@pytest.fixture
+def client(client, queue, monkeypatch):
+    monkeypatch.setattr(model_database_API, "job_queue", queue)
+    return client
+
+
+def crash(db):
+    os._exit(1)
+
+
+def rollup_count(engine):
+    with engine.connect() as connection:
+        return connection.scalar(select(func.count()).select_from(InspectionRollup))
+
+
+def inspection_count(engine):
+    with engine.connect() as connection:
+        return connection.scalar(select(func.count()).select_from(Inspection))
+
+
+def wait_for(job):
+    job.future.exception(timeout=60)
+    # The completion callback runs right after the future is resolved.
+    while job.finished_at is None:
+        time.sleep(0.01)
+
+
+def test_job_runs_in_a_worker_process_and_invalidates_on_success(
+    engine, queue, invalidated
+):
+    job = queue.submit(
+        "inspection-plan",
+        plan_semester,
+        "Winter 2024",
+        list(range(1, 201)),
+        invalidates=("inspections",),
+    )
+    wait_for(job)
+
+    assert job.status == "succeeded"
+    result = job.future.result()
+    assert result["planned"] + result["rejected"] == 200
+    assert inspection_count(engine) == 20 + result["planned"]
+    assert invalidated == ["inspections"]
+    assert queue.metrics()["succeeded"] == 1
+
+
+def test_failed_job_reports_its_error(queue, invalidated):
+    job = queue.submit(
+        "inspection-plan",
+        plan_semester,
+        "Summer 1999",
+        [1],
+        invalidates=("inspections",),
+    )
+    wait_for(job)
+
+    assert job.describe()["status"] == "failed"
+    assert job.describe()["error"] == "No inspection schedule found."
+    assert invalidated == []
+
+
+def test_a_crashed_worker_does_not_break_later_jobs(queue, invalidated):
+    crashed = queue.submit("crash", crash)
+    wait_for(crashed)
+    assert isinstance(crashed.future.exception(), BrokenProcessPool)
+
+    job = queue.submit(
+        "inspection-plan",
+        plan_semester,
+        "Winter 2024",
+        [1],
+        invalidates=("inspections",),
+    )
+    wait_for(job)
+
+    assert job.status == "succeeded"
+    assert invalidated == ["inspections"]
+
+
+def test_finished_jobs_are_forgotten_beyond_the_history(engine):
+    queue = JobQueue(DatabaseSettings(url=str(engine.url)), history=1)
+    jobs = []
+    for _ in range(3):
+        future = Future()
+        jobs.append(Job("test", future))
+        queue._jobs[jobs[-1].id] = jobs[-1]
+    for job in jobs[:2]:
+        job.future.set_result(None)
+        queue._finished(job)
+
+    assert queue.get(jobs[0].id) is None
+    assert queue.get(jobs[1].id) is jobs[1]
+    assert queue.get(jobs[2].id).status == "pending"
+
+
+def test_job_endpoints_submit_poll_and_return_the_plan(engine, client, queue):
+    response = client.post(
+        "/jobs/inspection-plan/",
+        json={"semester": "Winter 2024", "lesson_ids": [1, 2, 3], "dry_run": True},
+    )
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.json()["status"] in ("pending", "running")
+
+    wait_for(queue.get(job_id))
+    assert client.get(f"/jobs/{job_id}/").json()["status"] == "succeeded"
+    result = client.get(f"/jobs/{job_id}/result/").json()
+    assert result["planned"] + result["rejected"] == 3
+    assert inspection_count(engine) == 20
+
+    assert client.get("/jobs/unknown/").status_code == 404
+    pending = Job("inspection-plan", Future())
+    queue._jobs[pending.id] = pending
+    response = client.get(f"/jobs/{pending.id}/result/")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Job is pending."
+
+
+def test_inspection_stats_refresh_job_rebuilds_the_rollups(
+    engine, client, queue, invalidated
+):
+    with engine.begin() as connection:
+        connection.execute(InspectionRollup.__table__.delete())
+
+    response = client.post("/jobs/inspection-stats-refresh/")
+    assert response.status_code == 202
+    job = queue.get(response.json()["id"])
+    wait_for(job)
+
+    assert job.future.result() == {"rollups": rollup_count(engine)}
+    assert rollup_count(engine) > 0
+    assert invalidated == ["reports"]
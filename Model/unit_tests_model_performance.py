@@ -0,0 +1,307 @@
+"""
+Performance regression suite for the API endpoints.
+
+Every endpoint is called through ``TestClient`` against a seeded synthetic
+university (see ``synthetic_data.py``). Each test records the median latency
+and the number of SQL statements of one request and fails when the endpoint
+executes more statements than ``performance_baseline.json`` allows, or when it
+is more than ``PERF_TOLERANCE`` times slower than the recorded median.
+Latencies are only compared when the data set has the baseline's size.
+
+Environment:
+    PERF_DATABASE_URL           a disposable database to use instead of an
+                                in-memory SQLite one; its tables are dropped
+    PERF_TEACHERS, PERF_TEAMS, PERF_SUBJECTS, PERF_LESSONS_PER_TEACHER,
+    PERF_INSPECTIONS            size of the synthetic university
+    PERF_ROUNDS                 timed requests per endpoint (default 5)
+    PERF_TOLERANCE              allowed slowdown over the baseline (default 3)
+    PERF_REPORT                 write the measurements to this JSON file
+    PERF_UPDATE_BASELINE=1      rewrite the baseline from this run
+"""
+
+import itertools
+import json
+import os
+import statistics
+import time
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from model_database_API import reference_cache
+from models_sqlalchemy import Base, Inspection, Lesson
+from synthetic_data import count_statements, create_sqlite_engine, seed_university
+
+BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "performance_baseline.json"
+)
+SIZE = {
+    "teachers": int(os.environ.get("PERF_TEACHERS", 500)),
+    "teams": int(os.environ.get("PERF_TEAMS", 100)),
+    "subjects": int(os.environ.get("PERF_SUBJECTS", 50)),
+    "lessons_per_teacher": int(os.environ.get("PERF_LESSONS_PER_TEACHER", 10)),
+    "inspections": int(os.environ.get("PERF_INSPECTIONS", 500)),
+}
+ROUNDS = int(os.environ.get("PERF_ROUNDS", 5))
+TOLERANCE = float(os.environ.get("PERF_TOLERANCE", 3))
+# Absolute allowance so sub-millisecond endpoints do not fail on noise.
+SLACK_MS = 5
+
+REPORT = {
+    "lateness_minutes": 3,
+    "students_attendance": 12,
+    "room_adaptation": "Adapted",
+    "content_compatibility": 4,
+    "substantive_rating": "Good",
+    "final_rating": 4,
+    "objection": "No objections",
+}
+BULK_TERMS = 10
+
+
+def created_term(client, targets):
+    return "/inspection-terms/", {
+        "fk_lesson": next(targets["free_lessons"]),
+        "fk_inspectionTeam": targets["team_id"],
+    }
+
+
+def created_terms(client, targets):
+    return "/inspection-terms/bulk/", [
+        created_term(client, targets)[1] for _ in range(BULK_TERMS)
+    ]
+
+
+def edited_term(client, targets):
+    return f"/inspection-term/edit/{targets['inspection_id']}/", {
+        "fk_lesson": targets["lesson_id"],
+        "fk_inspectionTeam": targets["team_id"],
+    }
+
+
+def removed_term(client, targets):
+    return f"/inspection-terms/{next(targets['removable_terms'])}/remove-term/", None
+
+
+def created_team(client, targets):
+    return "/inspection-teams/", {"name": f"Team {next(targets['team_names'])}"}
+
+
+def added_member(client, targets):
+    path, payload = created_team(client, targets)
+    team = client.post(path, json=payload).json()
+    return f"/inspection-teams/{team['id']}/add-teacher/", {
+        "teacher_id": targets["teacher_id"]
+    }
+
+
+def removed_member(client, targets):
+    path, payload = added_member(client, targets)
+    assert client.post(path, json=payload).status_code == 200
+    return path.replace("add-teacher", "remove-teacher"), payload
+
+
+# Values are (method, path, payload[, headers]), or (method, prepare) for
+# writes that cannot be repeated: ``prepare(client, targets)`` sets up every
+# call, outside of the measurement, and returns its path and payload. The job
+# endpoints are left out: POST /jobs/inspection-plan/ hands ``plan_semester``
+# to a worker process (its queries are those of POST /inspection-schedule/plan/),
+# and the polling endpoints read the memory of the API process.
+ENDPOINTS = {
+    "GET /inspection-docs/": ("GET", "/inspection-docs/", None),
+    "GET /inspection-docs/?limit": ("GET", "/inspection-docs/?limit=50", None),
+    "GET /inspection-docs/export/": (
+        "GET",
+        "/inspection-docs/export/?format=csv",
+        None,
+    ),
+    "GET /inspection-docs/{docs_id}/": ("GET", "/inspection-docs/1/", None),
+    "POST /inspection-docs/{docs_id}/edit/": (
+        "POST",
+        "/inspection-docs/1/edit/",
+        REPORT,
+        {"If-Match": "*"},
+    ),
+    "GET /inspection-term/{term_id}/": ("GET", "/inspection-term/{lesson_id}/", None),
+    "GET /inspection-terms/": ("GET", "/inspection-terms/", None),
+    "GET /inspection-terms/?limit": ("GET", "/inspection-terms/?limit=50", None),
+    "GET /lesson_with_dates/{teacher_id}/{subject_id}/": (
+        "GET",
+        "/lesson_with_dates/{teacher_id}/{subject_id}/",
+        None,
+    ),
+    "GET /inspection-teams/": ("GET", "/inspection-teams/", None),
+    "GET /inspection-teams/{team_id}/": ("GET", "/inspection-teams/1/", None),
+    "GET /inspection-teams/{teacher_id}/{lesson_id}/": (
+        "GET",
+        "/inspection-teams/{teacher_id}/{lesson_id}/",
+        None,
+    ),
+    "GET /teachers/": ("GET", "/teachers/", None),
+    "GET /lessons/": ("GET", "/lessons/?semester=Winter 2024", None),
+    "GET /lessons/?limit": ("GET", "/lessons/?semester=Winter 2024&limit=50", None),
+    "GET /unique-subjects/{teacher_id}/": (
+        "GET",
+        "/unique-subjects/{teacher_id}/",
+        None,
+    ),
+    "GET /inspection-schedule/semesters/": (
+        "GET",
+        "/inspection-schedule/semesters/",
+        None,
+    ),
+    "GET /schedule/": ("GET", "/schedule/?semester=Winter 2024", None),
+    "GET /inspection-stats/": (
+        "GET",
+        "/inspection-stats/?by=department&semester=Winter 2024",
+        None,
+    ),
+    "POST /inspection-schedule/plan/": (
+        "POST",
+        "/inspection-schedule/plan/",
+        {
+            "semester": "Winter 2024",
+            "lesson_ids": list(range(1, 501)),
+            "dry_run": True,
+        },
+    ),
+    "POST /busy-slots/refresh/": ("POST", "/busy-slots/refresh/", None),
+    "POST /schedule/refresh/": ("POST", "/schedule/refresh/", None),
+    "POST /inspection-stats/refresh/": ("POST", "/inspection-stats/refresh/", None),
+    "GET /metrics": ("GET", "/metrics", None),
+    # Writes changing the data set come last.
+    "POST /inspection-term/edit/{term_id}/": ("POST", edited_term),
+    "POST /inspection-terms/": ("POST", created_term),
+    "POST /inspection-terms/bulk/": ("POST", created_terms),
+    "DELETE /inspection-terms/{term_id}/remove-term/": ("DELETE", removed_term),
+    "POST /inspection-teams/": ("POST", created_team),
+    "POST /inspection-teams/{team_id}/add-teacher/": ("POST", added_member),
+    "DELETE /inspection-teams/{team_id}/remove-teacher/": ("DELETE", removed_member),
+}
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_FILE):
+        return {"size": None, "endpoints": {}}
+    with open(BASELINE_FILE, encoding="utf-8") as file:
+        return json.load(file)
+
+
+@pytest.fixture(scope="module")
+def measurements():
+    results = {}
+    yield results
+    report = {"size": SIZE, "rounds": ROUNDS, "endpoints": results}
+    if os.environ.get("PERF_REPORT"):
+        with open(os.environ["PERF_REPORT"], "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    if os.environ.get("PERF_UPDATE_BASELINE") == "1":
+        report.pop("rounds")
+        with open(BASELINE_FILE, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+            file.write("\n")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    url = os.environ.get("PERF_DATABASE_URL")
+    if url:
+        engine = create_engine(url)
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+    else:
+        engine = create_sqlite_engine()
+    with sessionmaker(bind=engine)() as db:
+        seed_university(db, **SIZE)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def targets(engine):
+    with sessionmaker(bind=engine)() as db:
+        lesson = db.execute(
+            select(
+                Lesson.id,
+                Lesson.fk_teacher,
+                Lesson.fk_subject,
+                Inspection.id.label("inspection_id"),
+                Inspection.fk_inspectionTeam,
+            )
+            .join(Inspection, Inspection.fk_lesson == Lesson.id)
+            .order_by(Inspection.id)
+            .limit(1)
+        ).one()
+        free_lessons = db.scalars(
+            select(Lesson.id)
+            .where(
+                ~select(Inspection.id).where(Inspection.fk_lesson == Lesson.id).exists()
+            )
+            .order_by(Lesson.id)
+        ).all()
+        removable_terms = db.scalars(
+            select(Inspection.id).order_by(Inspection.id.desc()).limit(ROUNDS + 2)
+        ).all()
+    return {
+        "lesson_id": lesson.id,
+        "teacher_id": lesson.fk_teacher,
+        "subject_id": lesson.fk_subject,
+        "inspection_id": lesson.inspection_id,
+        "team_id": lesson.fk_inspectionTeam,
+        "free_lessons": iter(free_lessons),
+        "removable_terms": iter(removable_terms),
+        "team_names": itertools.count(1),
+    }
+
+
+def request(name, client, targets):
+    method, *target = ENDPOINTS[name]
+    if callable(target[0]):
+        return (method, *target[0](client, targets))
+    path, payload, *headers = target
+    return (method, path.format(**targets), payload, *headers)
+
+
+def call(client, method, path, payload, headers=None):
+    # Measure the database path, not the reference data cache.
+    reference_cache.clear()
+    response = client.request(method, path, json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+
+@pytest.mark.parametrize("name", ENDPOINTS)
+def test_endpoint_performance(engine, client, targets, measurements, name):
+    call(client, *request(name, client, targets))
+    arguments = request(name, client, targets)
+    with count_statements(engine) as statements:
+        call(client, *arguments)
+    timings = []
+    for _ in range(ROUNDS):
+        arguments = request(name, client, targets)
+        started = time.perf_counter()
+        call(client, *arguments)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    measured = {
+        "statements": len(statements),
+        "median_ms": round(statistics.median(timings), 2),
+    }
+    measurements[name] = measured
+    if os.environ.get("PERF_UPDATE_BASELINE") == "1":
+        return
+
+    baseline = load_baseline()
+    expected = baseline["endpoints"].get(name)
+    assert expected is not None, f"{name} has no baseline, see PERF_UPDATE_BASELINE"
+    assert measured["statements"] <= expected["statements"], (
+        f"{name} executes {measured['statements']} statements, "
+        f"the baseline is {expected['statements']}"
+    )
+    if baseline["size"] == SIZE:
+        allowed = expected["median_ms"] * TOLERANCE + SLACK_MS
+        assert measured["median_ms"] <= allowed, (
+            f"{name} takes {measured['median_ms']} ms, "
+            f"the baseline is {expected['median_ms']} ms"
+        )
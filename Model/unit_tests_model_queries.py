@@ -0,0 +1,1222 @@
+import csv
+import io
+import json
+import logging
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import Response
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import model_database_API
+import planner
+from availability import busy_teachers_query, busy_teams_query, lesson_period
+from analytics import DIMENSIONS
+from database import DatabaseSettings, create_configured_async_engine
+from model_database_API import (
+    app,
+    edit_inspection_report,
+    get_db,
+    get_read_db,
+    reference_cache,
+    report_edit,
+    request_metrics,
+)
+from models_sqlalchemy import (
+    Inspection,
+    InspectionReport,
+    InspectionRollup,
+    InspectionSchedule,
+    InspectionTeam,
+    Lesson,
+    ScheduleEntry,
+    Subject,
+    Teacher,
+    TeacherBusySlot,
+    TeacherInspectionTeam,
+)
+from models_pydantic import EditInspectionReport
+from planner import BusyIndex, PlannedLesson, PlanSolver
+from request_metrics import current_request
+from synthetic_data import count_statements, create_sqlite_engine, seed_university
+
+
+@pytest.fixture
+def university():
+    return {
+        "teachers": 60,
+        "teams": 15,
+        "subjects": 10,
+        "lessons_per_teacher": 5,
+        "inspections": 40,
+    }
+
+
+def test_specified_inspection_teams_statement_count_is_constant(engine, client):
+    with count_statements(engine) as statements:
+        response = client.get("/inspection-teams/1/1/")
+
+    assert response.status_code == 200
+    assert len(statements) == 3
+    for team in response.json():
+        assert set(team) == {"inspection_team_id", "inspection_team_name", "members"}
+        assert team["members"]
+
+
+def test_server_timing_reports_the_statements_of_a_request(engine, client):
+    with count_statements(engine) as statements:
+        response = client.get("/inspection-teams/1/1/")
+
+    assert re.fullmatch(
+        r'app;dur=[\d.]+, db;dur=[\d.]+;desc="3 statements, \d+ rows"',
+        response.headers["Server-Timing"],
+    )
+    assert len(statements) == 3
+
+
+READ_PATHS = [
+    "/inspection-docs/",
+    "/inspection-docs/?limit=3",
+    "/inspection-docs/1/",
+    "/inspection-term/{lesson_id}/",
+    "/inspection-terms/?semester=Winter 2024",
+    "/lesson_with_dates/1/1/",
+    "/inspection-teams/",
+    "/inspection-teams/1/",
+    "/inspection-teams/1/1/",
+    "/teachers/",
+    "/unique-subjects/1/",
+    "/lessons/?semester=Winter 2024&limit=5",
+    "/inspection-schedule/semesters/",
+    "/schedule/?semester=Winter 2024",
+    "/inspection-stats/?by=department",
+]
+
+
+def test_async_mode_serves_the_same_reads(tmp_path, monkeypatch):
+    path = tmp_path / "university.db"
+    engine = create_sqlite_engine(f"sqlite:///{path}")
+    with sessionmaker(bind=engine)() as db:
+        seed_university(db, teachers=20, teams=4, subjects=5, inspections=10)
+        lesson_id = db.scalar(select(Inspection.fk_lesson).limit(1))
+    paths = [path.format(lesson_id=lesson_id) for path in READ_PATHS]
+    async_engine = create_configured_async_engine(
+        DatabaseSettings(
+            url=f"sqlite:///{path}", async_url=f"sqlite+aiosqlite:///{path}"
+        )
+    )
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    async_session_factory = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+    def override_get_db():
+        with session_factory() as db:
+            yield db
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        with TestClient(app) as client:
+            sync_responses = [client.get(path) for path in paths]
+            reference_cache.clear()
+            app.dependency_overrides[get_read_db] = override_get_async_db
+            monkeypatch.setattr(model_database_API, "async_engine", async_engine)
+            async_responses = [client.get(path) for path in paths]
+            metrics = client.get("/metrics").text
+            client.portal.call(async_engine.dispose)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_read_db, None)
+        engine.dispose()
+
+    for path, sync_response, async_response in zip(
+        paths, sync_responses, async_responses
+    ):
+        assert sync_response.status_code == 200, path
+        assert async_response.status_code == 200, path
+        assert async_response.json() == sync_response.json(), path
+        assert re.search(
+            r'db;dur=[\d.]+;desc="[1-9]\d* statements?',
+            async_response.headers["Server-Timing"],
+        ), path
+    checkouts = re.search(r'db_pool_checkouts_total\{engine="async"\} (\d+)', metrics)
+    assert int(checkouts.group(1)) >= len(paths)
+
+
+def test_request_metrics_add_up_per_endpoint(client):
+    request_metrics.clear()
+    client.get("/inspection-teams/1/1/")
+    client.get("/inspection-teams/1/1/")
+
+    metrics = request_metrics.metrics()
+    assert metrics[("http_requests_total", "get_specified_inspection_teams")] == 2
+    assert metrics[("db_statements_total", "get_specified_inspection_teams")] == 6
+    assert (
+        'db_statements_total{endpoint="get_specified_inspection_teams"} 6'
+        in client.get("/metrics").text
+    )
+
+
+def test_failed_statements_leave_no_timing_behind(engine):
+    stats = request_metrics.start()
+    token = current_request.set(stats)
+    try:
+        with engine.connect() as connection:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    connection.exec_driver_sql("SELECT * FROM missing_table")
+            connection.exec_driver_sql("SELECT 1")
+            leftovers = [key for key in connection.info if "request_metrics" in key]
+    finally:
+        current_request.reset(token)
+
+    assert stats.statements == 1
+    assert stats.db_seconds < stats.elapsed()
+    assert not leftovers
+
+
+def test_slow_requests_are_logged_with_their_sql(client, caplog, monkeypatch):
+    monkeypatch.setattr(request_metrics, "slow_request_ms", 0.001)
+    with caplog.at_level(logging.WARNING, logger="inspections.slow_requests"):
+        client.get("/inspection-teams/1/1/")
+
+    assert "GET /inspection-teams/1/1/ took" in caplog.text
+    assert "3 statements" in caplog.text
+    assert "SELECT" in caplog.text
+
+
+def test_specified_inspection_teams_excludes_own_team(engine, client):
+    response = client.get("/inspection-teams/1/1/")
+    teams_with_teacher = {
+        team["id"]
+        for team in client.get("/inspection-teams/").json()
+        if any(
+            member["id"] == 1
+            for member in client.get(f"/inspection-teams/{team['id']}/").json()[
+                "teachers"
+            ]
+        )
+    }
+
+    assert teams_with_teacher.isdisjoint(
+        team["inspection_team_id"] for team in response.json()
+    )
+
+
+def test_schedule_statement_count_does_not_grow_with_semester(engine, client):
+    with count_statements(engine) as statements:
+        response = client.get("/schedule/", params={"semester": "Winter 2024"})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 40
+    assert len(statements) == 1
+
+    larger_engine = create_sqlite_engine()
+    with sessionmaker(bind=larger_engine)() as db:
+        seed_university(db, teachers=200, teams=50, inspections=600)
+    app.dependency_overrides[get_db] = lambda: sessionmaker(bind=larger_engine)()
+
+    with count_statements(larger_engine) as larger_statements:
+        response = client.get("/schedule/", params={"semester": "Winter 2024"})
+
+    assert len(response.json()) == 600
+    assert len(larger_statements) == len(statements)
+    larger_engine.dispose()
+
+
+def test_schedule_lists_team_members(client):
+    schedule = client.get("/schedule/", params={"semester": "Winter 2024"}).json()
+
+    assert [entry["lesson"]["time"] for entry in schedule] == sorted(
+        entry["lesson"]["time"] for entry in schedule
+    )
+    for entry in schedule:
+        assert set(entry) == {"lesson", "subject", "teacher", "inspection_team"}
+        assert len(entry["inspection_team"]) == 3
+
+
+def test_schedule_follows_team_changes(client):
+    def team_sizes():
+        response = client.get("/schedule/", params={"semester": "Winter 2024"})
+        assert "Last-Modified" in response.headers
+        return [len(entry["inspection_team"]) for entry in response.json()]
+
+    term = client.get("/inspection-terms/").json()[0]
+    member = client.get(f"/inspection-teams/{term['team_id']}/").json()["teachers"][0]
+    inspected_by_team = sum(
+        t["team_id"] == term["team_id"] for t in client.get("/inspection-terms/").json()
+    )
+
+    client.request(
+        "DELETE",
+        f"/inspection-teams/{term['team_id']}/remove-teacher/",
+        json={"teacher_id": member["id"]},
+    )
+
+    assert team_sizes().count(2) == inspected_by_team
+    assert client.post("/schedule/refresh/").json()["entries"] == 40
+    assert team_sizes().count(2) == inspected_by_team
+
+
+def test_schedule_keeps_the_first_inspection_of_a_lesson(engine, client):
+    def lesson_teams(lesson_time):
+        return [
+            entry["inspection_team"]
+            for entry in client.get(
+                "/schedule/", params={"semester": "Winter 2024"}
+            ).json()
+            if entry["lesson"]["time"] == lesson_time
+        ]
+
+    term = client.get("/inspection-terms/").json()[0]
+    first_team = lesson_teams(term["date"])
+    with engine.begin() as connection:
+        inspection = connection.execute(
+            select(Inspection).where(Inspection.id == term["id"])
+        ).one()
+        # A second inspection of the lesson, written directly.
+        connection.execute(
+            insert(Inspection).values(
+                fk_inspectionSchedule=inspection.fk_inspectionSchedule,
+                fk_inspectionTeam=inspection.fk_inspectionTeam % 15 + 1,
+                fk_lesson=inspection.fk_lesson,
+            )
+        )
+    client.post("/schedule/refresh/")
+    # Reverse the row order the entries of the lesson would otherwise tie in.
+    with engine.begin() as connection:
+        connection.execute(update(ScheduleEntry).values(id=-ScheduleEntry.id))
+
+    assert lesson_teams(term["date"]) == first_team
+
+
+def test_schedule_unknown_semester_is_empty(client):
+    response = client.get("/schedule/", params={"semester": "Summer 2023"})
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+@pytest.mark.parametrize("path", ["/inspection-terms/", "/inspection-docs/"])
+def test_keyset_pages_cover_the_unpaginated_list(client, path):
+    everything = client.get(path).json()
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 7} if cursor is None else {"limit": 7, "cursor": cursor}
+        page = client.get(path, params=params).json()
+        pages.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(pages) == len(everything) == 40
+    assert sorted(pages, key=lambda item: item["id"]) == sorted(
+        everything, key=lambda item: item["id"]
+    )
+    assert [item["date"] for item in pages] == sorted(item["date"] for item in pages)
+
+
+def test_lessons_of_a_semester_are_paginated_in_one_statement(engine, client):
+    with count_statements(engine) as statements:
+        everything = client.get("/lessons/", params={"semester": "Winter 2024"})
+    pages, cursor = [], None
+    while True:
+        params = {"semester": "Winter 2024", "limit": 40}
+        if cursor is not None:
+            params["cursor"] = cursor
+        page = client.get("/lessons/", params=params).json()
+        pages.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(statements) == 1
+    assert len(everything.json()) == 300
+    assert pages == everything.json()
+    assert [lesson["time"] for lesson in pages] == sorted(
+        lesson["time"] for lesson in pages
+    )
+    assert {lesson["year_semester"] for lesson in pages} == {"Winter 2024"}
+    assert client.get("/lessons/", params={"semester": "Summer 2030"}).status_code == (
+        404
+    )
+
+
+def test_lesson_with_dates_returns_a_time_range(engine, client):
+    with sessionmaker(bind=engine)() as db:
+        lesson = db.scalars(select(Lesson).order_by(Lesson.id)).first()
+        week_start = lesson.time - timedelta(days=3)
+        week_end = week_start + timedelta(days=7)
+        expected = db.scalars(
+            select(Lesson.id)
+            .where(
+                Lesson.fk_teacher == lesson.fk_teacher,
+                Lesson.fk_subject == lesson.fk_subject,
+                Lesson.time >= week_start,
+                Lesson.time < week_end,
+            )
+            .order_by(Lesson.time)
+        ).all()
+    path = f"/lesson_with_dates/{lesson.fk_teacher}/{lesson.fk_subject}/"
+
+    week = client.get(
+        path,
+        params={"date_from": week_start.isoformat(), "date_to": week_end.isoformat()},
+    ).json()
+
+    assert lesson.id in expected
+    assert [item["id"] for item in week] == expected
+    assert datetime.fromisoformat(week[0]["time"]) >= week_start
+    # The seeded semester is over, so nothing is upcoming by default.
+    assert client.get(path).json() == []
+
+
+def test_unique_subjects_group_upcoming_lessons(engine, client):
+    soon = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    lessons = [(1, 2, soon + timedelta(days=7 * week)) for week in range(3)]
+    lessons += [(1, 3, soon + timedelta(hours=2)), (1, 3, soon + timedelta(days=9))]
+    lessons += [(1, 4, soon - timedelta(days=30)), (2, 4, soon)]
+    with sessionmaker(bind=engine)() as db:
+        db.execute(
+            insert(Lesson),
+            [
+                {
+                    "time": time,
+                    "room": "Room 101",
+                    "building": "A1",
+                    "fk_subject": subject_id,
+                    "fk_teacher": teacher_id,
+                }
+                for teacher_id, subject_id, time in lessons
+            ],
+        )
+        db.commit()
+
+    with count_statements(engine) as statements:
+        subjects = client.get("/unique-subjects/1/").json()
+
+    assert len(statements) == 1
+    assert {
+        subject["subject_id"]: (
+            subject["upcoming_lessons"],
+            datetime.fromisoformat(subject["next_lesson_time"]),
+        )
+        for subject in subjects
+    } == {2: (3, soon), 3: (2, soon + timedelta(hours=2))}
+
+
+def test_unique_subjects_stop_counting_started_lessons(engine, client, monkeypatch):
+    starts = datetime(2030, 1, 7, 8, 0)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Lesson).values(
+                time=starts,
+                room="Room 101",
+                building="A1",
+                fk_subject=2,
+                fk_teacher=1,
+            )
+        )
+
+    class Clock(datetime):
+        current = starts - timedelta(minutes=1)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.current
+
+    monkeypatch.setattr(model_database_API, "datetime", Clock)
+    subjects = client.get("/unique-subjects/1/").json()
+    assert [subject["upcoming_lessons"] for subject in subjects] == [1]
+
+    Clock.current = starts + timedelta(minutes=1)
+    assert client.get("/unique-subjects/1/").json() == []
+
+
+def test_inspection_terms_filters(client):
+    everything = client.get("/inspection-terms/").json()
+    teacher_id = everything[0]["teacher_id"]
+
+    by_teacher = client.get("/inspection-terms/", params={"teacher_id": teacher_id})
+    by_range = client.get(
+        "/inspection-terms/",
+        params={"date_from": "2024-11-01T00:00:00", "date_to": "2024-12-01T00:00:00"},
+    )
+    other_semester = client.get(
+        "/inspection-terms/", params={"semester": "Winter 2023"}
+    )
+
+    # Unpaginated listings have no guaranteed order, the plan depends on indexes.
+    def by_id(terms):
+        return sorted(terms, key=lambda term: term["id"])
+
+    assert by_id(by_teacher.json()) == by_id(
+        term for term in everything if term["teacher_id"] == teacher_id
+    )
+    assert by_id(by_range.json()) == by_id(
+        term for term in everything if "2024-11-01" <= term["date"] < "2024-12-01"
+    )
+    assert other_semester.json() == []
+
+
+def test_inspection_terms_invalid_cursor(client):
+    response = client.get("/inspection-terms/", params={"limit": 5, "cursor": "x"})
+
+    assert response.status_code == 400
+
+
+def test_export_ndjson_streams_every_report(client):
+    response = client.get("/inspection-docs/export/")
+    lines = response.text.splitlines()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len(lines) == 40
+    assert [json.loads(line)["report_id"] for line in lines] == list(range(1, 41))
+
+
+def test_export_csv_has_header_and_rows(client):
+    response = client.get(
+        "/inspection-docs/export/", params={"format": "csv", "subject_type": "Lecture"}
+    )
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    lectures = [
+        doc
+        for doc in client.get("/inspection-docs/").json()
+        if doc["subject_type"] == "Lecture"
+    ]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert sorted(int(row["report_id"]) for row in rows) == sorted(
+        doc["id"] for doc in lectures
+    )
+
+
+def expected_stats(engine, dimension):
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(
+                DIMENSIONS[dimension],
+                InspectionReport.final_rating,
+                InspectionReport.lateness_minutes,
+            )
+            .select_from(Inspection)
+            .join(
+                InspectionReport, InspectionReport.id == Inspection.fk_inspectionReport
+            )
+            .join(
+                InspectionSchedule,
+                InspectionSchedule.id == Inspection.fk_inspectionSchedule,
+            )
+            .join(Lesson, Lesson.id == Inspection.fk_lesson)
+            .join(Teacher, Teacher.id == Lesson.fk_teacher)
+            .join(Subject, Subject.id == Lesson.fk_subject)
+        ).all()
+    groups = defaultdict(list)
+    for group, rating, lateness in rows:
+        groups[group].append((rating, lateness))
+    return {
+        group: {
+            "reports": len(reports),
+            "average_final_rating": round(
+                sum(rating for rating, _ in reports) / len(reports), 2
+            ),
+            "over 15": sum(lateness > 15 for _, lateness in reports),
+            "0": sum(lateness == 0 for _, lateness in reports),
+        }
+        for group, reports in groups.items()
+    }
+
+
+@pytest.mark.parametrize("dimension", ["department", "subject_type", "building"])
+def test_inspection_stats_match_the_reports(engine, client, dimension):
+    response = client.get(
+        "/inspection-stats/", params={"by": dimension, "semester": "Winter 2024"}
+    )
+
+    assert response.status_code == 200
+    assert {
+        stats["group"]: {
+            "reports": stats["reports"],
+            "average_final_rating": stats["average_final_rating"],
+            "over 15": stats["lateness"]["over 15"],
+            "0": stats["lateness"]["0"],
+        }
+        for stats in response.json()
+    } == expected_stats(engine, dimension)
+    assert client.get("/inspection-stats/", params={"by": "room"}).status_code == 422
+
+
+def test_inspection_stats_use_the_semester_of_the_schedule(engine, client):
+    # The lessons are labelled with another semester than the schedule their
+    # inspections belong to; the listings go by the schedule, so must the stats.
+    with engine.begin() as connection:
+        connection.execute(update(Lesson).values(year_semester="Summer 2024"))
+        term = connection.execute(
+            select(Inspection.id, Inspection.fk_inspectionTeam).where(
+                Inspection.fk_inspectionReport.is_not(None)
+            )
+        ).first()
+        uninspected = connection.scalar(
+            select(Lesson.id)
+            .where(Lesson.id.not_in(select(Inspection.fk_lesson)))
+            .limit(1)
+        )
+    client.post("/inspection-stats/refresh/")
+
+    moved = client.post(
+        f"/inspection-term/edit/{term.id}/",
+        json={"fk_lesson": uninspected, "fk_inspectionTeam": term.fk_inspectionTeam},
+    )
+    removed = client.delete("/inspection-terms/2/remove-term/")
+    edited = client.post(
+        "/inspection-docs/3/edit/",
+        json={
+            "lateness_minutes": 30,
+            "students_attendance": 12,
+            "room_adaptation": "Adapted",
+            "content_compatibility": 4,
+            "substantive_rating": "Good",
+            "final_rating": 5,
+            "objection": "No objections",
+        },
+        headers={"If-Match": "*"},
+    )
+    updated = {
+        by: client.get("/inspection-stats/", params={"by": by}).json()
+        for by in DIMENSIONS
+    }
+    client.post("/inspection-stats/refresh/")
+
+    assert [moved.status_code, removed.status_code, edited.status_code] == [200] * 3
+    assert {
+        by: client.get("/inspection-stats/", params={"by": by}).json()
+        for by in DIMENSIONS
+    } == updated
+    assert [stats["semester"] for stats in updated["semester"]] == client.get(
+        "/inspection-schedule/semesters/"
+    ).json()
+    assert [stats["reports"] for stats in updated["semester"]] == [39]
+
+
+def test_report_edit_updates_only_its_groups(engine, client):
+    with engine.begin() as connection:
+        connection.execute(
+            update(InspectionRollup).values(refreshed_at=datetime(2000, 1, 1))
+        )
+    before = client.get("/inspection-stats/").json()[0]
+
+    with count_statements(engine) as statements:
+        response = client.post(
+            "/inspection-docs/1/edit/",
+            json={
+                "lateness_minutes": 30,
+                "students_attendance": 12,
+                "room_adaptation": "Adapted",
+                "content_compatibility": 4,
+                "substantive_rating": "Good",
+                "final_rating": 5,
+                "objection": "No objections",
+            },
+            headers={"If-Match": '"1"'},
+        )
+    after = client.get("/inspection-stats/").json()[0]
+
+    assert response.status_code == 200
+    # The report lookup (SQLite only) and update, the group lookup and one
+    # rollup update.
+    assert len(statements) <= 4
+    expected = expected_stats(engine, "semester")["Winter 2024"]
+    assert after["reports"] == before["reports"] == 40
+    assert after["average_final_rating"] == expected["average_final_rating"]
+    # Seeded reports are at most 15 minutes late.
+    assert after["lateness"]["over 15"] == before["lateness"]["over 15"] + 1
+    with engine.connect() as connection:
+        refreshed = connection.scalars(
+            select(InspectionRollup.dimension).where(
+                InspectionRollup.refreshed_at > datetime(2000, 1, 1)
+            )
+        ).all()
+    assert sorted(refreshed) == sorted(DIMENSIONS)
+    updated = {
+        by: client.get("/inspection-stats/", params={"by": by}).json()
+        for by in DIMENSIONS
+    }
+    client.post("/inspection-stats/refresh/")
+    assert {
+        by: client.get("/inspection-stats/", params={"by": by}).json()
+        for by in DIMENSIONS
+    } == updated
+
+    client.delete("/inspection-terms/1/remove-term/")
+    assert client.get("/inspection-stats/").json()[0]["reports"] == 39
+
+
+def test_inspection_doc_is_read_in_one_statement(engine, client):
+    for docs_id in (1, 2, 3):
+        with count_statements(engine) as statements:
+            response = client.get(f"/inspection-docs/{docs_id}/")
+
+        # Built from lazy loads, the way the endpoint used to read the document.
+        with sessionmaker(bind=engine)() as db:
+            inspection = db.get(Inspection, docs_id)
+            teacher = inspection.lesson.teacher
+            report = inspection.inspection_report
+            members = sorted(inspection.inspection_team.teachers, key=lambda m: m.id)
+            expected = {
+                "inspected_name": f"{teacher.title} {teacher.name} {teacher.surname}",
+                "department_name": teacher.department,
+                "date_of_inspection": inspection.lesson.time.isoformat(),
+                "subject_name": inspection.lesson.subject.name,
+                "subject_code": inspection.lesson.subject.id,
+                "inspectors": [
+                    {
+                        "name": member.teacher.name,
+                        "surname": member.teacher.surname,
+                        "title": member.teacher.title,
+                    }
+                    for member in members
+                ],
+                "lateness_minutes": report.lateness_minutes or 0,
+                "student_attendance": report.students_attendance,
+                "room_adaptation": report.room_adaptation,
+                "content_compatibility": report.content_compatibility,
+                "substantive_rating": report.substantive_rating,
+                "final_rating": report.final_rating,
+                "objection": report.objection,
+                "report_version": report.version,
+            }
+
+        assert response.status_code == 200
+        assert len(statements) == 1
+        assert len(expected["inspectors"]) == 3
+        assert response.json() == expected
+    assert client.get("/inspection-docs/10000/").status_code == 404
+
+
+def test_report_edit_is_checked_against_the_if_match_version(engine, client):
+    report = {
+        "lateness_minutes": 30,
+        "students_attendance": 12,
+        "room_adaptation": "Adapted",
+        "content_compatibility": 4,
+        "substantive_rating": "Good",
+        "final_rating": 5,
+        "objection": "No objections",
+    }
+    document = client.get("/inspection-docs/1/")
+    etag = f'"{document.json()["report_version"]}"'
+    stats = client.get("/inspection-stats/").json()
+
+    with count_statements(engine) as statements:
+        first = client.post(
+            "/inspection-docs/1/edit/", json=report, headers={"If-Match": etag}
+        )
+    second = client.post(
+        "/inspection-docs/1/edit/",
+        json={**report, "final_rating": 1},
+        headers={"If-Match": etag},
+    )
+
+    assert first.status_code == 200
+    assert first.json()["version"] == 2
+    assert first.headers["etag"] == '"2"' != etag
+    # SQLite reads the report before the update, see apply_report_edit.
+    reads = [s for s in statements if 'FROM "InspectionReport"' in s]
+    writes = [s for s in statements if s.startswith('UPDATE "InspectionReport"')]
+    assert len(reads) == 1 and len(writes) == 1 and "RETURNING" in writes[0]
+    assert second.status_code == 409
+    assert second.headers["etag"] == first.headers["etag"]
+    edited = client.get("/inspection-docs/1/")
+    assert edited.json()["final_rating"] == 5
+    assert edited.json()["report_version"] == 2
+    assert edited.headers["etag"] not in (document.headers["etag"], etag)
+    # The document's ETag also follows the data that has no report version.
+    with engine.begin() as connection:
+        connection.execute(update(Teacher).values(surname="Renamed"))
+    renamed = client.get("/inspection-docs/1/")
+    assert renamed.json()["report_version"] == 2
+    assert renamed.headers["etag"] != edited.headers["etag"]
+    # The rejected edit left the rollups as the accepted one did.
+    after = client.get("/inspection-stats/").json()
+    assert after[0]["lateness"]["over 15"] == stats[0]["lateness"]["over 15"] + 1
+
+    assert (
+        client.post(
+            "/inspection-docs/1/edit/", json=report, headers={"If-Match": '"2", "3"'}
+        ).headers["etag"]
+        == '"3"'
+    )
+    assert client.post("/inspection-docs/1/edit/", json=report).status_code == 428
+    assert (
+        client.post(
+            "/inspection-docs/1/edit/", json=report, headers={"If-Match": "*"}
+        ).json()["version"]
+        == 4
+    )
+    for weak in ('W/"4"', '"draft", W/"4"'):
+        rejected = client.post(
+            "/inspection-docs/1/edit/", json=report, headers={"If-Match": weak}
+        )
+        assert rejected.status_code == 409
+        assert rejected.headers["etag"] == '"4"'
+    assert (
+        client.post(
+            "/inspection-docs/999/edit/", json=report, headers={"If-Match": '"1"'}
+        ).status_code
+        == 404
+    )
+    assert (
+        client.post(
+            "/inspection-docs/1/edit/", json=report, headers={"If-Match": "W/1"}
+        ).status_code
+        == 400
+    )
+
+
+def test_report_edit_is_one_statement_on_postgresql():
+    statement = str(
+        report_edit(1, [2, 3], {"final_rating": 5}).compile(
+            dialect=postgresql.dialect()
+        )
+    )
+
+    assert statement.count("SELECT") == 1
+    assert 'FOR UPDATE OF "InspectionReport") AS "old"' in statement
+    assert '"InspectionReport".version = "old".version' in statement
+    assert '"old".final_rating AS old_final_rating' in statement
+    assert 'RETURNING "InspectionReport".id' in statement
+
+
+def test_interleaved_report_edits_keep_the_rollups_exact(engine, client):
+    report = {
+        "lateness_minutes": 30,
+        "students_attendance": 12,
+        "room_adaptation": "Adapted",
+        "content_compatibility": 4,
+        "substantive_rating": "Good",
+        "final_rating": 5,
+        "objection": "No objections",
+    }
+    interleaved = []
+
+    # Another edit of the same report commits between the first edit's read
+    # and its update, which SQLite's missing row locks allow.
+    @event.listens_for(engine, "after_cursor_execute")
+    def edit_in_between(conn, cursor, statement, parameters, context, executemany):
+        if interleaved or 'FROM "InspectionReport"' not in statement:
+            return
+        interleaved.append(True)
+        with sessionmaker(bind=engine, autoflush=False)() as db:
+            edit_inspection_report(
+                1,
+                EditInspectionReport(
+                    **{**report, "lateness_minutes": 20, "final_rating": 1}
+                ),
+                Response(),
+                '"1"',
+                db,
+            )
+
+    response = client.post(
+        "/inspection-docs/1/edit/", json=report, headers={"If-Match": "*"}
+    )
+    event.remove(engine, "after_cursor_execute", edit_in_between)
+
+    assert interleaved
+    # The first edit read version 1, which the other edit replaced.
+    assert response.status_code == 409
+    assert response.headers["etag"] == '"2"'
+    assert client.get("/inspection-docs/1/").json()["final_rating"] == 1
+    updated = {
+        by: client.get("/inspection-stats/", params={"by": by}).json()
+        for by in DIMENSIONS
+    }
+    client.post("/inspection-stats/refresh/")
+    assert {
+        by: client.get("/inspection-stats/", params={"by": by}).json()
+        for by in DIMENSIONS
+    } == updated
+    assert {
+        stats["group"]: stats["average_final_rating"] for stats in updated["semester"]
+    } == {
+        semester: expected["average_final_rating"]
+        for semester, expected in expected_stats(engine, "semester").items()
+    }
+
+
+def test_inspection_teams_expand_members_in_one_statement(engine, client):
+    with count_statements(engine) as statements:
+        response = client.get("/inspection-teams/", params={"expand": "members"})
+    teams = response.json()
+
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert len(teams) == 15
+    for team in teams:
+        details = client.get(f"/inspection-teams/{team['id']}/").json()
+        assert team["name"] == details["name"]
+        assert sorted(team["teachers"], key=lambda teacher: teacher["id"]) == sorted(
+            details["teachers"], key=lambda teacher: teacher["id"]
+        )
+
+
+def test_bulk_inspection_terms_reports_each_item(engine, client):
+    scheduled = client.get("/inspection-terms/").json()[0]["lesson_id"]
+    free = sorted(
+        {lesson for lesson in range(1, 301)}
+        - {term["lesson_id"] for term in client.get("/inspection-terms/").json()}
+    )[:3]
+    terms = [
+        {"fk_lesson": free[0], "fk_inspectionTeam": 1},
+        {"fk_lesson": scheduled, "fk_inspectionTeam": 1},
+        {"fk_lesson": free[1], "fk_inspectionTeam": 2},
+        {"fk_lesson": free[0], "fk_inspectionTeam": 3},
+        {"fk_lesson": 10_000, "fk_inspectionTeam": 1},
+        {"fk_lesson": free[2], "fk_inspectionTeam": 999},
+    ]
+
+    with count_statements(engine) as statements:
+        response = client.post("/inspection-terms/bulk/", json=terms)
+    body = response.json()
+
+    assert response.status_code == 200
+    assert (body["created"], body["rejected"]) == (2, 4)
+    assert [result["status"] for result in body["results"]] == [
+        "created",
+        "conflict",
+        "created",
+        "duplicate",
+        "not_found",
+        "not_found",
+    ]
+    assert body["results"][1]["detail"] == "Lesson already has an inspection scheduled."
+    assert body["results"][3]["detail"] == "Lesson appears earlier in the batch."
+    inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+    assert len([s for s in inserts if '"Inspection"' in s]) == 1
+    # Lookups, the team lock, the insert, and the busy slot and schedule refreshes.
+    assert len(statements) <= 14
+    created = {term["id"]: term for term in client.get("/inspection-terms/").json()}
+    assert created[body["results"][0]["id"]]["lesson_id"] == free[0]
+    assert created[body["results"][2]["id"]]["team_id"] == 2
+
+
+def member_count(engine, team_id):
+    with engine.connect() as connection:
+        return connection.scalar(
+            select(InspectionTeam.member_count).where(InspectionTeam.id == team_id)
+        )
+
+
+def test_team_member_count_follows_adds_and_removals(engine, client):
+    members = [
+        teacher["id"]
+        for teacher in client.get("/inspection-teams/1/").json()["teachers"]
+    ]
+    outsider = next(
+        teacher["id"]
+        for teacher in client.get("/teachers/").json()
+        if teacher["id"] not in members
+    )
+    assert member_count(engine, 1) == 3
+
+    with count_statements(engine) as statements:
+        full = client.post(
+            "/inspection-teams/1/add-teacher/", json={"teacher_id": outsider}
+        )
+    client.request(
+        "DELETE",
+        "/inspection-teams/1/remove-teacher/",
+        json={"teacher_id": members[0]},
+    )
+    assert member_count(engine, 1) == 2
+    added = client.post(
+        "/inspection-teams/1/add-teacher/", json={"teacher_id": outsider}
+    )
+
+    assert full.status_code == 409
+    assert not any("COUNT(" in statement.upper() for statement in statements)
+    assert added.status_code == 200
+    assert member_count(engine, 1) == 3
+
+
+def test_team_member_limit_holds_without_the_api(engine):
+    with engine.connect() as connection:
+        with pytest.raises(IntegrityError, match="inspectionteam_member_count_check"):
+            connection.execute(
+                insert(TeacherInspectionTeam).values(fk_teacher=1, fk_inspectionTeam=1)
+            )
+
+
+def busy(engine, query, starts_at, ends_at):
+    with engine.connect() as connection:
+        return set(connection.scalars(query(starts_at, ends_at)))
+
+
+def test_busy_slots_detect_overlapping_ranges(engine):
+    with engine.connect() as connection:
+        lesson = connection.execute(select(Lesson.fk_teacher, Lesson.time)).first()
+    starts_at, ends_at = lesson_period(lesson.time)
+    minute = timedelta(minutes=1)
+
+    assert lesson.fk_teacher in busy(
+        engine, busy_teachers_query, starts_at - minute, starts_at + minute
+    )
+    assert lesson.fk_teacher in busy(
+        engine, busy_teachers_query, ends_at - minute, ends_at + minute
+    )
+    assert lesson.fk_teacher not in busy(
+        engine, busy_teachers_query, ends_at, ends_at + minute
+    )
+    assert lesson.fk_teacher not in busy(
+        engine, busy_teachers_query, starts_at - minute, starts_at
+    )
+
+
+def test_busy_slots_follow_inspection_and_team_writes(engine, client):
+    scheduled = {term["lesson_id"] for term in client.get("/inspection-terms/").json()}
+    with engine.connect() as connection:
+        lesson = connection.execute(
+            select(Lesson.id, Lesson.time).where(Lesson.id.notin_(scheduled))
+        ).first()
+    period = lesson_period(lesson.time)
+
+    def inspectors():
+        with engine.connect() as connection:
+            return set(
+                connection.scalars(
+                    select(TeacherBusySlot.fk_teacher).where(
+                        TeacherBusySlot.fk_lesson == lesson.id,
+                        TeacherBusySlot.source == "inspecting",
+                    )
+                )
+            )
+
+    members = {
+        teacher["id"]
+        for teacher in client.get("/inspection-teams/2/").json()["teachers"]
+    }
+    client.post(
+        "/inspection-terms/", json={"fk_lesson": lesson.id, "fk_inspectionTeam": 2}
+    )
+    assert inspectors() == members
+    assert 2 in busy(engine, busy_teams_query, *period)
+    assert members <= busy(engine, busy_teachers_query, *period)
+
+    leaving = min(members)
+    client.request(
+        "DELETE", "/inspection-teams/2/remove-teacher/", json={"teacher_id": leaving}
+    )
+    assert inspectors() == members - {leaving}
+
+    term_id = next(
+        term["id"]
+        for term in client.get("/inspection-terms/").json()
+        if term["lesson_id"] == lesson.id
+    )
+    client.delete(f"/inspection-terms/{term_id}/remove-term/")
+    assert inspectors() == set()
+    assert 2 not in busy(engine, busy_teams_query, *period)
+    missing = client.delete(f"/inspection-terms/{term_id}/remove-term/")
+    assert missing.status_code == 404
+    assert missing.json()["detail"] == "Inspection term not found"
+
+
+def test_busy_slots_refresh_rebuilds_every_slot(engine, client):
+    with engine.begin() as connection:
+        connection.execute(delete(TeacherBusySlot))
+
+    response = client.post("/busy-slots/refresh/")
+
+    # One slot per lesson taught and one per team member per inspection.
+    assert response.status_code == 200
+    assert response.json()["slots"] == 300 + 40 * 3
+
+
+def test_planned_inspections_respect_team_constraints(engine, client):
+    with count_statements(engine) as statements:
+        response = client.post(
+            "/inspection-schedule/plan/",
+            json={
+                "semester": "Winter 2024",
+                "lesson_ids": list(range(1, 301)),
+                "max_inspections_per_team": 20,
+            },
+        )
+    body = response.json()
+
+    assert response.status_code == 200
+    assert body["planned"] > 200
+    assert body["planned"] + body["rejected"] == 300
+    assert (
+        Counter(result["status"] for result in body["rejected_lessons"])["conflict"]
+        == 40
+    )
+    inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+    assert len([s for s in inserts if '"Inspection"' in s]) == 1
+    # Loading the plan's data, the team lock and re-check, the insert, and the
+    # busy slot and schedule refreshes.
+    assert len(statements) <= 16
+
+    with sessionmaker(bind=engine)() as db:
+        departments = dict(db.execute(select(Teacher.id, Teacher.department)).all())
+        lessons = {row.id: row for row in db.execute(select(Lesson)).scalars()}
+        members = defaultdict(set)
+        for team_id, teacher_id in db.execute(
+            select(
+                TeacherInspectionTeam.fk_inspectionTeam,
+                TeacherInspectionTeam.fk_teacher,
+            )
+        ):
+            members[team_id].add(teacher_id)
+        inspections = db.execute(
+            select(Inspection.fk_lesson, Inspection.fk_inspectionTeam)
+        ).all()
+
+    commitments = defaultdict(list)
+    for lesson in lessons.values():
+        commitments[lesson.fk_teacher].append((lesson_period(lesson.time), None))
+    for lesson_id, team_id in inspections:
+        for teacher_id in members[team_id]:
+            commitments[teacher_id].append(
+                (lesson_period(lessons[lesson_id].time), lesson_id)
+            )
+
+    for assignment in body["assignments"]:
+        lesson = lessons[assignment["fk_lesson"]]
+        team = members[assignment["fk_inspectionTeam"]]
+        starts_at, ends_at = lesson_period(lesson.time)
+        assert lesson.fk_teacher not in team
+        department = departments[lesson.fk_teacher]
+        assert sum(departments[member] == department for member in team) <= 1
+        for member in team:
+            assert [
+                inspected
+                for (start, end), inspected in commitments[member]
+                if start < ends_at and starts_at < end
+            ] == [lesson.id]
+    loads = Counter(team_id for _, team_id in inspections)
+    assert all(
+        loads[assignment["fk_inspectionTeam"]] <= 20
+        for assignment in body["assignments"]
+    )
+
+
+def test_plan_rejects_lessons_and_dry_run_writes_nothing(engine, client):
+    scheduled = client.get("/inspection-terms/").json()[0]["lesson_id"]
+    free = sorted(
+        set(range(1, 301))
+        - {term["lesson_id"] for term in client.get("/inspection-terms/").json()}
+    )[:5]
+
+    response = client.post(
+        "/inspection-schedule/plan/",
+        json={
+            "semester": "Winter 2024",
+            "lesson_ids": [*free, scheduled, 10_000],
+            "dry_run": True,
+        },
+    )
+    body = response.json()
+
+    assert response.status_code == 200
+    assert [assignment["fk_lesson"] for assignment in body["assignments"]] == free
+    assert all("id" not in assignment for assignment in body["assignments"])
+    assert [result["status"] for result in body["rejected_lessons"]] == [
+        "conflict",
+        "not_found",
+    ]
+    assert len(client.get("/inspection-terms/").json()) == 40
+
+    response = client.post(
+        "/inspection-schedule/plan/",
+        json={"semester": "Summer 1999", "lesson_ids": free},
+    )
+    assert response.status_code == 404
+
+
+def test_plan_leaves_out_teams_booked_while_planning(engine, client, monkeypatch):
+    lessons = [term["lesson_id"] for term in client.get("/inspection-terms/").json()]
+    with engine.connect() as connection:
+        times = dict(connection.execute(select(Lesson.id, Lesson.time)).all())
+        teachers = dict(connection.execute(select(Lesson.id, Lesson.fk_teacher)).all())
+        members = defaultdict(set)
+        for team_id, teacher_id in connection.execute(
+            select(
+                TeacherInspectionTeam.fk_inspectionTeam,
+                TeacherInspectionTeam.fk_teacher,
+            )
+        ):
+            members[team_id].add(teacher_id)
+    free = [lesson for lesson in sorted(times) if lesson not in lessons]
+    plan = {"semester": "Winter 2024", "lesson_ids": free[:1]}
+    planned = client.post(
+        "/inspection-schedule/plan/", json={**plan, "dry_run": True}
+    ).json()["assignments"][0]
+    team = planned["fk_inspectionTeam"]
+    # Another lesson at the same time, which the team can inspect too.
+    other = next(
+        lesson
+        for lesson in free[1:]
+        if times[lesson] == times[planned["fk_lesson"]]
+        and teachers[lesson] not in members[team]
+    )
+    lock_teams = planner.lock_teams
+
+    def book_first(db, team_ids):
+        # Another writer books the team after the plan was read, and commits
+        # before the planner gets the lock.
+        booked = client.post(
+            "/inspection-terms/", json={"fk_lesson": other, "fk_inspectionTeam": team}
+        )
+        assert booked.status_code == 200
+        lock_teams(db, team_ids)
+
+    monkeypatch.setattr(planner, "lock_teams", book_first)
+    body = client.post("/inspection-schedule/plan/", json=plan).json()
+
+    assert body["planned"] == 0
+    assert body["rejected_lessons"] == [
+        {
+            "fk_lesson": planned["fk_lesson"],
+            "status": "conflict",
+            "detail": "A team member was booked during the lesson while planning.",
+        }
+    ]
+    assert {
+        term["lesson_id"]: term["team_id"]
+        for term in client.get("/inspection-terms/").json()
+        if term["lesson_id"] not in lessons
+    } == {other: team}
+
+
+def test_planner_repairs_by_moving_a_planned_lesson():
+    times = [datetime(2024, 10, 7, hour) for hour in (8, 10, 12)]
+    lessons = [
+        PlannedLesson(lesson_id, 100 + lesson_id, "Mathematics", time)
+        for lesson_id, time in enumerate(times, start=1)
+    ]
+    busy = BusyIndex()
+    busy.add(3, *lesson_period(times[0]))
+    busy.add(2, *lesson_period(times[1]))
+    busy.add(2, *lesson_period(times[2]))
+    teams = {team_id: [(team_id, f"Department {team_id}")] for team_id in (1, 2, 3)}
+
+    assignments, unassigned = PlanSolver(teams, busy, {}, capacity=1).solve(lessons)
+
+    # Greedy gives lesson 1 team 1 and lesson 2 team 3, leaving lesson 3 nothing
+    # until lesson 1 moves to team 2.
+    assert assignments == {1: 2, 2: 3, 3: 1}
+    assert unassigned == {}